@@ -0,0 +1,289 @@
+# admission.py - Admission control and load shedding for the analyze endpoints
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+# Largest request body accepted, in bytes (larger bodies get 413)
+MAX_BODY_BYTES = int(os.environ.get('ADMISSION_MAX_BODY_BYTES', 256 * 1024))
+# Largest article analyzed, in characters
+MAX_TEXT_CHARS = int(os.environ.get('ADMISSION_MAX_TEXT_CHARS', 50000))
+
+# Requests processed at once; further requests wait in a bounded queue
+MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', os.cpu_count() or 2))
+MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 32))
+# Requests one client may have running or queued at the same time
+MAX_PER_CLIENT = int(os.environ.get('ADMISSION_MAX_PER_CLIENT', 4))
+# Time budget of a request that does not send X-Deadline-Ms
+DEFAULT_DEADLINE_MS = int(os.environ.get('ADMISSION_DEADLINE_MS', 5000))
+
+DEADLINE_HEADER = 'X-Deadline-Ms'
+
+# Reverse proxies in front of the app that append to X-Forwarded-For. The
+# client address is the hop the outermost of them appended; earlier hops are
+# whatever the client sent. 0 (default) ignores the header: set it to 1 when
+# deployed behind one proxy, e.g. Vercel or nginx
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+
+# Weight of the newest sample in the moving average of service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+class Rejected(Exception):
+    """Request refused before it was processed"""
+
+    def __init__(self, status, reason, retry_after=None, message=None):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+        if message is None:
+            message = 'Too many requests from this client' if status == 429 else 'Server busy, retry later'
+        self.message = message
+
+
+def body_length(headers):
+    """Declared Content-Length; Rejected (400/413) if invalid or over MAX_BODY_BYTES"""
+    try:
+        length = int(headers.get('Content-Length') or 0)
+        if length < 0:
+            raise ValueError(length)
+    except ValueError:
+        raise Rejected(400, 'bad_content_length', message='Invalid Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise Rejected(413, 'body_too_large', message='Request body too large')
+    return length
+
+
+def check_text(text, max_text_chars=MAX_TEXT_CHARS):
+    """Rejected (413) if the article is longer than max_text_chars"""
+    if isinstance(text, str) and len(text) > max_text_chars:
+        raise Rejected(413, 'text_too_long', message=f'Text longer than {max_text_chars} characters')
+
+
+class _Ticket:
+    __slots__ = ('client', 'deadline', 'granted', 'cancelled', 'enqueued')
+
+    def __init__(self, client, deadline):
+        self.client = client
+        self.deadline = deadline
+        self.granted = False
+        self.cancelled = False
+        self.enqueued = time.monotonic()
+
+
+class AdmissionController:
+    """Bounded concurrency with an earliest-deadline-first wait queue.
+
+    A request runs at once if a slot is free; otherwise it waits in a queue
+    of at most max_queue requests, ordered by deadline. Requests are refused
+    up front when the client already has max_per_client requests in flight
+    (429) or the queue is full (503), and dropped (503) if their deadline
+    passes before a slot frees up. Rejections carry a Retry-After estimate.
+    """
+
+    def __init__(self, name='analyze', max_concurrent=None, max_queue=None,
+                 max_per_client=None, default_deadline_ms=None):
+        self.name = name
+        self.max_concurrent = max_concurrent or MAX_CONCURRENT
+        self.max_queue = MAX_QUEUE if max_queue is None else max_queue
+        self.max_per_client = max_per_client or MAX_PER_CLIENT
+        self.default_deadline_ms = default_deadline_ms or DEFAULT_DEADLINE_MS
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._queued = 0
+        self._per_client = Counter()
+
+        self._service_time = 0.0
+        self._admitted = 0
+        self._completed = 0
+        self._rejected = Counter()
+        self._peak_queue_depth = 0
+        self._queue_wait_total = 0.0
+
+    def deadline(self, budget_ms=None):
+        """Absolute monotonic deadline for a request with this budget"""
+        if budget_ms is None:
+            budget_ms = self.default_deadline_ms
+        return time.monotonic() + budget_ms / 1000
+
+    def retry_after(self):
+        """Whole seconds until a slot is likely to free up"""
+        backlog = (self._queued + self._active) / self.max_concurrent
+        return max(1, int(backlog * self._service_time + 0.999))
+
+    def _reject(self, status, reason):
+        self._rejected[reason] += 1
+        raise Rejected(status, reason, self.retry_after())
+
+    def acquire(self, client, deadline=None):
+        """Block until the request may run; raises Rejected otherwise"""
+        deadline = deadline if deadline is not None else self.deadline()
+        with self._cond:
+            if time.monotonic() >= deadline:
+                self._reject(503, 'deadline_expired')
+            if self._per_client[client] >= self.max_per_client:
+                self._reject(429, 'client_limit')
+
+            ticket = _Ticket(client, deadline)
+            self._per_client[client] += 1
+            if self._active < self.max_concurrent and not self._queued:
+                self._start(ticket, time.monotonic())
+                return ticket
+
+            if self._queued >= self.max_queue:
+                self._leave(client)
+                self._reject(503, 'queue_full')
+
+            heapq.heappush(self._queue, (deadline, next(self._sequence), ticket))
+            self._queued += 1
+            self._peak_queue_depth = max(self._peak_queue_depth, self._queued)
+
+            while not ticket.granted:
+                if ticket.cancelled or time.monotonic() >= deadline:
+                    if not ticket.cancelled:
+                        # Still in the heap; _dispatch skips cancelled tickets
+                        ticket.cancelled = True
+                        self._queued -= 1
+                    self._leave(client)
+                    self._reject(503, 'deadline_expired')
+                self._cond.wait(deadline - time.monotonic())
+            return ticket
+
+    def release(self, ticket, elapsed):
+        """Free the ticket's slot and record how long the request ran"""
+        with self._cond:
+            self._active -= 1
+            self._completed += 1
+            self._leave(ticket.client)
+            self._service_time += SERVICE_TIME_SMOOTHING * (elapsed - self._service_time)
+            self._dispatch()
+
+    def _start(self, ticket, now):
+        ticket.granted = True
+        self._active += 1
+        self._admitted += 1
+        self._queue_wait_total += now - ticket.enqueued
+
+    def _leave(self, client):
+        self._per_client[client] -= 1
+        if self._per_client[client] <= 0:
+            del self._per_client[client]
+
+    def _dispatch(self):
+        """Hand free slots to queued requests, earliest deadline first"""
+        now = time.monotonic()
+        while self._queue and self._active < self.max_concurrent:
+            deadline, _, ticket = heapq.heappop(self._queue)
+            if ticket.cancelled:
+                continue
+            self._queued -= 1
+            if deadline <= now:
+                # Expired while queued: its waiter wakes up and rejects it
+                ticket.cancelled = True
+                continue
+            self._start(ticket, now)
+        self._cond.notify_all()
+
+    def metrics(self):
+        with self._cond:
+            return {
+                'name': self.name,
+                'active': self._active,
+                'queue_depth': self._queued,
+                'peak_queue_depth': self._peak_queue_depth,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self._admitted,
+                'completed': self._completed,
+                'rejected': dict(self._rejected),
+                'rejected_total': sum(self._rejected.values()),
+                'mean_queue_wait_ms': self._queue_wait_total / max(self._admitted, 1) * 1000,
+                'service_time_ms': self._service_time * 1000,
+            }
+
+
+def client_address(headers, remote_addr, trusted_hops=None):
+    """Client address as seen by the trusted proxies, else the peer address"""
+    trusted_hops = TRUSTED_PROXY_HOPS if trusted_hops is None else trusted_hops
+    if trusted_hops > 0:
+        hops = [hop.strip() for hop in headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return remote_addr or 'unknown'
+
+
+def client_id(request):
+    """client_address() of a Flask request"""
+    return client_address(request.headers, request.remote_addr)
+
+
+def request_deadline(controller, headers):
+    """Deadline from the X-Deadline-Ms budget header, else the default budget"""
+    try:
+        budget_ms = float(headers.get(DEADLINE_HEADER))
+    except (TypeError, ValueError):
+        budget_ms = None
+    return controller.deadline(budget_ms)
+
+
+def _error(message, status, reason, retry_after=None):
+    from flask import jsonify
+
+    response = jsonify({'error': message, 'reason': reason})
+    response.status_code = status
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def limit(controller, max_text_chars=MAX_TEXT_CHARS):
+    """Flask view decorator: size limits, then a slot from the controller"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import request
+
+            # Checked before the body is read; MAX_CONTENT_LENGTH covers
+            # chunked bodies that do not declare a length
+            if (request.content_length or 0) > MAX_BODY_BYTES:
+                return _error('Request body too large', 413, 'body_too_large')
+            data = request.get_json(silent=True)
+            try:
+                check_text(data.get('text') if isinstance(data, dict) else None, max_text_chars)
+            except Rejected as e:
+                return _error(e.message, e.status, e.reason)
+
+            ticket = controller.acquire(client_id(request), request_deadline(controller, request.headers))
+            start = time.monotonic()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(ticket, time.monotonic() - start)
+        return wrapper
+    return decorator
+
+
+def install(app, controllers):
+    """Body size limit, JSON 413/429/503 responses and GET /metrics for a Flask app"""
+    from flask import jsonify
+
+    app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_BYTES
+
+    @app.errorhandler(Rejected)
+    def rejected(error):
+        return _error(error.message, error.status, error.reason, error.retry_after)
+
+    @app.errorhandler(413)
+    def too_large(error):
+        return _error('Request body too large', 413, 'body_too_large')
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return jsonify({'admission': [controller.metrics() for controller in controllers]})
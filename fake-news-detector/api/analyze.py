@@ -2,14 +2,32 @@ from http.server import BaseHTTPRequestHandler
 import json
 import sys
 import os
+from urllib.parse import parse_qs, urlparse
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from model import FakeNewsDetector
+from model import get_detector
+from cascade import CascadeDetector, TIER_ENSEMBLE
+from links import link_analysis
+from admission import Rejected, body_length, check_text
+from profiling import PROFILE_ID_HEADER, admin_response, model_version, profile, requested_mode, stage
 
-# Initialize detector globally
-detector = FakeNewsDetector()
+# Initialize detector globally (shared with the other endpoints in this process)
+detector = get_detector()
+detector.enable_monitoring()
+
+# Set ANALYZE_MODE=cascade to serve the cascade by default
+DEFAULT_MODE = os.environ.get('ANALYZE_MODE', 'standard')
+
+_cascade = None
+
+def get_cascade():
+    """Lazily build the cascade so it shares the warm fast detector"""
+    global _cascade
+    if _cascade is None:
+        _cascade = CascadeDetector(fast_detector=detector)
+    return _cascade
 
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
@@ -20,12 +38,31 @@ class handler(BaseHTTPRequestHandler):
         self.end_headers()
         return
 
+    def do_GET(self):
+        # Slowest recent profiles (?profiles[&limit=N]) or one (?profile=<id>)
+        status, response = admin_response(self.headers, parse_qs(urlparse(self.path).query, keep_blank_values=True))
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(response).encode())
+
     def do_POST(self):
         try:
             # Read request body
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
+            try:
+                content_length = body_length(self.headers)
+                post_data = self.rfile.read(content_length)
+                data = json.loads(post_data.decode('utf-8'))
+                check_text(data.get('text'))
+            except Rejected as e:
+                self.send_response(e.status)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                response = {'error': e.message}
+                self.wfile.write(json.dumps(response).encode())
+                return
             
             # Get text from request
             text = data.get('text', '').strip()
@@ -39,8 +76,18 @@ class handler(BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps(response).encode())
                 return
             
-            # Make prediction
-            prediction, confidence = detector.predict(text)
+            # Make prediction, profiled when asked for with X-Profile or sampled
+            with profile('analyze', requested_mode(self.headers), text, model_version(detector)) as record:
+                tier = None
+                if data.get('mode', DEFAULT_MODE) == 'cascade':
+                    prediction, confidence, tier = get_cascade().predict(text)
+                else:
+                    prediction, confidence = detector.predict(text)
+                answered_by = get_cascade().ensemble_detector if tier == TIER_ENSEMBLE else detector
+                explanation = None
+                if prediction is not None and data.get('explain'):
+                    with stage('explain'):
+                        explanation = answered_by.explain(text)
             
             if prediction is None:
                 self.send_response(500)
@@ -55,12 +102,21 @@ class handler(BaseHTTPRequestHandler):
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
+            if record is not None:
+                self.send_header(PROFILE_ID_HEADER, record['id'])
             self.end_headers()
             
             result = {
                 "prediction": "FAKE" if prediction == 0 else "REAL",
-                "confidence": round(confidence, 2)
+                "confidence": round(float(confidence), 2)
             }
+            if tier:
+                result["tier"] = tier
+            if tier == TIER_ENSEMBLE:
+                # Escalated articles also get their links checked
+                result["links"], result["link_summary"] = link_analysis(text)
+            if explanation is not None:
+                result["explanation"] = explanation
             
             self.wfile.write(json.dumps(result).encode())
             return
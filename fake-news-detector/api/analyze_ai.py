@@ -3,104 +3,37 @@ from http.server import BaseHTTPRequestHandler
 import json
 import sys
 import os
-import re
+from urllib.parse import parse_qs, urlparse
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from model import FakeNewsDetector
+from model import get_detector
+from cascade import CascadeDetector, TIER_FAST
+from admission import Rejected, body_length, check_text, client_address
+from links import link_analysis
+from features import extract_ai_features
+from scoring import get_scorer
+from profiling import PROFILE_ID_HEADER, admin_response, model_version, profile, requested_mode, stage
 
-detector = FakeNewsDetector()
+# Shared with the other endpoints served from this process
+detector = get_detector()
+# Verdicts and linguistic features of live traffic, for drift monitoring
+monitor = detector.enable_monitoring()
 
-def extract_urls(text):
-    """Extract all URLs from the text"""
-    # URL regex pattern
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    urls = re.findall(url_pattern, text)
-    
-    # Also find www. links
-    www_pattern = r'www\.(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    www_urls = re.findall(www_pattern, text)
-    
-    # Add http:// to www links
-    www_urls = ['http://' + url for url in www_urls]
-    
-    all_urls = list(set(urls + www_urls))  # Remove duplicates
-    return all_urls
+# Set ANALYZE_MODE=cascade to serve the cascade by default
+DEFAULT_MODE = os.environ.get('ANALYZE_MODE', 'standard')
 
-def analyze_url_credibility(url):
-    """Analyze URL for credibility indicators"""
-    url_lower = url.lower()
-    
-    # Trusted news sources
-    trusted_domains = [
-        'bbc.com', 'nytimes.com', 'wsj.com', 'reuters.com', 'apnews.com',
-        'npr.org', 'cnn.com', 'abcnews.go.com', 'cbsnews.com', 'nbcnews.com',
-        'theguardian.com', 'washingtonpost.com', 'bloomberg.com', 'forbes.com',
-        'time.com', 'newsweek.com', 'politico.com', 'theatlantic.com',
-        'economist.com', 'usatoday.com', 'latimes.com', 'chicagotribune.com',
-        'gov', 'edu', 'mil'  # Government, education, military domains
-    ]
-    
-    # Suspicious patterns
-    suspicious_patterns = [
-        'fake', 'hoax', 'conspiracy', 'truth', 'exposed', 'leaked',
-        'secret', 'hidden', 'shocking', 'unbelievable', 'click', 'viral'
-    ]
-    
-    credibility = 'unknown'
-    
-    # Check for trusted domains
-    for domain in trusted_domains:
-        if domain in url_lower:
-            credibility = 'trusted'
-            break
-    
-    # Check for suspicious patterns
-    if credibility == 'unknown':
-        for pattern in suspicious_patterns:
-            if pattern in url_lower:
-                credibility = 'suspicious'
-                break
-    
-    # Extract domain name
-    domain_match = re.search(r'://(?:www\.)?([^/]+)', url)
-    domain = domain_match.group(1) if domain_match else url
-    
-    return {
-        'url': url,
-        'domain': domain,
-        'credibility': credibility
-    }
+_cascade = None
 
-def extract_ai_features(text):
-    """Extract AI features without heavy dependencies"""
-    features = {}
-    
-    # Text statistics
-    features['text_length'] = len(text)
-    features['word_count'] = len(text.split())
-    features['avg_word_length'] = sum(len(word) for word in text.split()) / (len(text.split()) or 1)
-    
-    # Punctuation and capitalization patterns (fake news often has excessive punctuation/caps)
-    features['exclamation_count'] = text.count('!')
-    features['question_count'] = text.count('?')
-    features['caps_ratio'] = sum(1 for c in text if c.isupper()) / (len(text) or 1)
-    features['digit_ratio'] = sum(1 for c in text if c.isdigit()) / (len(text) or 1)
-    
-    # Clickbait indicators
-    clickbait_words = ['shocking', 'unbelievable', 'you wont believe', 'you won\'t believe', 
-                      'this one trick', 'doctors hate', 'secret', 'revealed', 'exposed']
-    features['clickbait_score'] = sum(1 for word in clickbait_words if word in text.lower())
-    
-    # Sensationalism indicators
-    sensational_words = ['breaking', 'urgent', 'alert', 'warning', 'exclusive', 'leaked', 
-                        'bombshell', 'scandal']
-    features['sensational_score'] = sum(1 for word in sensational_words if word in text.lower())
-    
-    return features
+def get_cascade():
+    """Lazily build the cascade so it shares the warm fast detector"""
+    global _cascade
+    if _cascade is None:
+        _cascade = CascadeDetector(fast_detector=detector)
+    return _cascade
 
-def analyze_with_ai(text):
+def analyze_with_ai(text, explain=False):
     """Analyze text with AI enhancements and link extraction"""
     # Get base prediction
     prediction, confidence = detector.predict(text)
@@ -113,18 +46,88 @@ def analyze_with_ai(text):
             'error': 'Model not available'
         }
     
-    label = "REAL" if prediction == 1 else "FAKE"
+    result = build_ai_analysis(
+        text, prediction, confidence,
+        'AI-Enhanced Ensemble (Logistic + Linguistic + Link Analysis)'
+    )
+    if explain:
+        with stage('explain'):
+            result['explanation'] = detector.explain(text)
+    return result
+
+def analyze_with_cascade(text, explain=False):
+    """Answer confident articles with the fast model, escalate the rest"""
+    prediction, confidence, tier = get_cascade().predict(text)
     
-    # Extract URLs from text
-    urls = extract_urls(text)
-    analyzed_links = [analyze_url_credibility(url) for url in urls]
+    if prediction is None:
+        return {
+            'prediction': 'ERROR',
+            'confidence': 0.0,
+            'ai_powered': False,
+            'tier': tier,
+            'error': 'Model not available'
+        }
+    
+    if tier == TIER_FAST:
+        result = {
+            'prediction': "REAL" if prediction == 1 else "FAKE",
+            'confidence': float(confidence),
+            'ai_powered': False,
+            'tier': tier,
+            'model_type': 'Logistic Regression (fast path)'
+        }
+        answered_by = detector
+    else:
+        result = build_ai_analysis(
+            text, prediction, confidence,
+            'AI Ensemble (Logistic + Random Forest) + Link Analysis'
+        )
+        result['tier'] = tier
+        answered_by = get_cascade().ensemble_detector
+    
+    if explain:
+        with stage('explain'):
+            result['explanation'] = answered_by.explain(text)
+    return result
+
+def analyze_with_models(text, explain=False, key=None):
+    """Verdict of the primary (or A/B candidate) model plus every registered model's score"""
+    scorer = get_scorer()
+    scored = scorer.score(text, key=key)
+    
+    if scored is None:
+        return {
+            'prediction': 'ERROR',
+            'confidence': 0.0,
+            'ai_powered': False,
+            'error': 'Model not available'
+        }
     
-    # Count credibility types
-    trusted_count = sum(1 for link in analyzed_links if link['credibility'] == 'trusted')
-    suspicious_count = sum(1 for link in analyzed_links if link['credibility'] == 'suspicious')
+    served = scorer.get(scored['model'])
+    prediction = 1 if scored['prediction'] == 'REAL' else 0
+    result = build_ai_analysis(text, prediction, scored['confidence'], f"Multi-model ({scored['model']})")
+    result['model'] = scored['model']
+    result['arm'] = scored['arm']
+    result['scores'] = scored['scores']
+    
+    if explain:
+        with stage('explain'):
+            result['explanation'] = served.detector.explain(text)
+    return result
+
+def build_ai_analysis(text, prediction, confidence, model_type):
+    """Attach linguistic warning signs and link credibility to a verdict"""
+    label = "REAL" if prediction == 1 else "FAKE"
+    
+    # Extract URLs from text and count credibility types
+    analyzed_links, link_summary = link_analysis(text)
+    trusted_count = link_summary['trusted']
+    suspicious_count = link_summary['suspicious']
     
     # Extract AI features
-    features = extract_ai_features(text)
+    with stage('ai_features'):
+        features = extract_ai_features(text)
+    monitor.observe_features(features)
     
     # Adjust confidence based on AI features
     warning_signs = []
@@ -156,7 +159,7 @@ def analyze_with_ai(text):
         if label == "FAKE":
             confidence_adjustment += 0.05
     
-    if len(urls) > 0 and trusted_count == 0:
+    if link_summary['total'] > 0 and trusted_count == 0:
         warning_signs.append("No trusted news sources linked")
     
     # Adjust confidence (cap at 0.99)
@@ -167,50 +170,84 @@ def analyze_with_ai(text):
         'confidence': adjusted_confidence,
         'ai_powered': True,
         'warning_signs': warning_signs,
-        'model_type': 'AI-Enhanced Ensemble (Logistic + Linguistic + Link Analysis)',
+        'model_type': model_type,
         'links': analyzed_links,
-        'link_summary': {
-            'total': len(urls),
-            'trusted': trusted_count,
-            'suspicious': suspicious_count,
-            'unknown': len(urls) - trusted_count - suspicious_count
-        }
+        'link_summary': link_summary
     }
 
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
-        # Set CORS headers
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-
+        record = None
         try:
-            # Get request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode('utf-8'))
+            # Refuse invalid or oversized bodies before reading them, and
+            # overlong articles before analyzing them
+            try:
+                content_length = body_length(self.headers)
+                body = self.rfile.read(content_length)
+                data = json.loads(body.decode('utf-8'))
+                check_text(data.get('text') if isinstance(data, dict) else None)
+            except Rejected as e:
+                self.send_response(e.status)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': e.message}).encode('utf-8'))
+                return
             
             text = data.get('text', '')
+            mode = data.get('mode', DEFAULT_MODE)
+            explain = bool(data.get('explain', False))
             
             if not text:
                 response = {
                     'error': 'No text provided'
                 }
             else:
-                response = analyze_with_ai(text)
-            
-            self.wfile.write(json.dumps(response).encode('utf-8'))
+                # Profiled when asked for with X-Profile, or sampled
+                with profile('analyze_ai', requested_mode(self.headers), text, model_version(detector)) as record:
+                    if mode == 'cascade':
+                        response = analyze_with_cascade(text, explain)
+                    elif mode == 'multi':
+                        # Clients stay on the same A/B arm across requests
+                        client = client_address(self.headers, self.client_address[0])
+                        response = analyze_with_models(text, explain, key=client)
+                    else:
+                        response = analyze_with_ai(text, explain)
             
         except Exception as e:
-            error_response = {
+            response = {
                 'error': str(e),
                 'prediction': 'ERROR',
                 'confidence': 0.0
             }
-            self.wfile.write(json.dumps(error_response).encode('utf-8'))
+
+        # Set CORS headers
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        if record is not None:
+            self.send_header(PROFILE_ID_HEADER, record['id'])
+        self.end_headers()
+        self.wfile.write(json.dumps(response).encode('utf-8'))
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query, keep_blank_values=True)
+        if 'scoring' in query:
+            # Per-model agreement with the primary model and A/B traffic served
+            status, response = 200, get_scorer().metrics()
+        elif 'profiles' in query or 'profile' in query:
+            # Slowest recent profiles (?profiles[&limit=N]) or one (?profile=<id>)
+            status, response = admin_response(self.headers, query)
+        else:
+            # Drift and score-distribution report of this instance's traffic
+            status, response = 200, monitor.report()
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(response).encode('utf-8'))
 
     def do_OPTIONS(self):
         # Handle preflight requests
@@ -0,0 +1,62 @@
+# cascade.py - Fast-path cascade between the linear model and the AI ensemble
+import os
+
+from model import get_detector
+
+# Confidence band (inclusive) in which the fast model's verdict is considered
+# uncertain and the article is escalated to the AI ensemble.
+# Override with e.g. CASCADE_BAND="0.5,0.8"
+DEFAULT_BAND = (0.5, 0.75)
+
+TIER_FAST = 'fast'
+TIER_ENSEMBLE = 'ensemble'
+
+
+def parse_band(value, default=DEFAULT_BAND):
+    """Parse a "low,high" string into a (low, high) tuple of floats"""
+    if not value:
+        return default
+    try:
+        low, high = (float(part) for part in str(value).split(','))
+    except ValueError:
+        print(f"Invalid cascade band {value!r}, using {default}")
+        return default
+    if low > high:
+        low, high = high, low
+    return low, high
+
+
+class CascadeDetector:
+    """Score with the fast linear model, escalate uncertain articles to the ensemble"""
+
+    def __init__(self, fast_detector=None, ensemble_detector=None, band=None):
+        self.fast_detector = fast_detector or get_detector()
+        # The ensemble is only loaded the first time an article is escalated
+        self._ensemble_detector = ensemble_detector
+        self.band = band or parse_band(os.environ.get('CASCADE_BAND'))
+
+    @property
+    def ensemble_detector(self):
+        if self._ensemble_detector is None:
+            from model_ai import get_detector as get_ai_detector
+            self._ensemble_detector = get_ai_detector()
+        return self._ensemble_detector
+
+    def is_uncertain(self, confidence, band=None):
+        low, high = band or self.band
+        return low <= confidence <= high
+
+    def predict(self, text, band=None):
+        """Return (prediction, confidence, tier) for the tier that answered"""
+        prediction, confidence = self.fast_detector.predict(text)
+
+        if prediction is None or not self.is_uncertain(confidence, band):
+            return prediction, confidence, TIER_FAST
+
+        ensemble_prediction, ensemble_confidence = self.ensemble_detector.predict(text)
+
+        # Keep the fast verdict if the ensemble is unavailable
+        if ensemble_prediction is None:
+            return prediction, confidence, TIER_FAST
+
+        return ensemble_prediction, ensemble_confidence, TIER_ENSEMBLE
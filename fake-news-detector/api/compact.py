@@ -0,0 +1,355 @@
+# compact.py - Reduced-precision, compressed model artifacts scored with NumPy
+import os
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import normalize
+
+from preprocess import preprocess, _uses_default_analyzer
+
+# 'float64' keeps serving the pickled sklearn models
+PRECISIONS = ('float64', 'float32', 'int8')
+DEFAULT_PRECISION = os.environ.get('MODEL_PRECISION', 'float64')
+
+# Rows scored at a time when comparing against the reference model
+PARITY_BATCH_SIZE = 256
+
+ARTIFACT_VERSION = 1
+
+
+def artifact_path(model_path, precision):
+    """fake_news_model.pkl -> fake_news_model.float32.npz"""
+    return f"{os.path.splitext(model_path)[0]}.{precision}.npz"
+
+
+def _quantize(values):
+    """Symmetric per-tensor int8: values ~= q * scale"""
+    peak = float(np.abs(values).max()) if values.size else 0.0
+    scale = peak / 127 if peak else 1.0
+    return np.round(values / scale).astype(np.int8), np.float32(scale)
+
+
+def _linear_arrays(model, n_tfidf, scaler=None):
+    coef = model.coef_[0].astype(np.float64)
+    intercept = float(model.intercept_[0])
+    if scaler is not None:
+        # Fold (x - mean) / scale into the linguistic weights
+        ling = coef[n_tfidf:] / scaler.scale_
+        intercept -= float(np.dot(ling, scaler.mean_))
+        coef = np.concatenate([coef[:n_tfidf], ling])
+    return coef, intercept
+
+
+def _forest_arrays(forest, precision):
+    """Every tree's nodes concatenated, children as absolute node ids"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left < 0
+        roots.append(offset)
+        features.append(np.where(leaf, -1, tree.feature))
+        thresholds.append(tree.threshold)
+        lefts.append(np.where(leaf, np.arange(tree.node_count), tree.children_left) + offset)
+        rights.append(np.where(leaf, np.arange(tree.node_count), tree.children_right) + offset)
+        counts = tree.value[:, 0, :]
+        values.append(counts[:, 1] / counts.sum(axis=1))
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    values = np.concatenate(values)
+    if precision == 'int8':
+        # Leaf probabilities in [0, 1] as 0..255
+        values = np.round(values * 255).astype(np.uint8)
+    else:
+        values = values.astype(np.float32)
+    return {
+        'forest_feature': np.concatenate(features).astype(np.int32),
+        'forest_threshold': np.concatenate(thresholds).astype(np.float32),
+        'forest_left': np.concatenate(lefts).astype(np.int32),
+        'forest_right': np.concatenate(rights).astype(np.int32),
+        'forest_value': values,
+        'forest_roots': np.array(roots, dtype=np.int32),
+        'forest_depth': np.int32(max_depth),
+    }
+
+
+def export(model, vectorizer, path, precision='float32', scaler=None):
+    """Write model + vectorizer as one compressed .npz of flat arrays.
+
+    Handles the basic LogisticRegression, the LR + random forest voter and
+    the distilled model (its scaler is folded into the weights). float32
+    halves every weight; int8 additionally quantizes the TF-IDF weights
+    (with one float scale) and the forest leaf probabilities.
+    """
+    if precision not in PRECISIONS[1:]:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {PRECISIONS[1:]}")
+    if not _uses_default_analyzer(vectorizer) or vectorizer.norm not in ('l2', None):
+        raise ValueError("Only word-level TF-IDF vectorizers can be exported")
+
+    if isinstance(model, VotingClassifier):
+        if model.voting != 'soft' or model.weights is not None:
+            raise ValueError("Only unweighted soft voting can be exported")
+        members = dict(model.named_estimators_)
+        linear, forest = members.get('lr'), members.get('rf')
+        if set(members) != {'lr', 'rf'} or not isinstance(forest, RandomForestClassifier):
+            raise ValueError("Expected an ('lr', 'rf') voting ensemble")
+    elif isinstance(model, LogisticRegression):
+        linear, forest = model, None
+    else:
+        raise ValueError(f"Cannot export {type(model).__name__}")
+
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    n_tfidf = len(terms)
+    coef, intercept = _linear_arrays(linear, n_tfidf, scaler)
+
+    arrays = {
+        'version': np.int32(ARTIFACT_VERSION),
+        'precision': np.array(precision),
+        'classes': np.asarray(model.classes_),
+        'vocabulary': np.frombuffer('\n'.join(terms).encode('utf-8'), dtype=np.uint8),
+        'idf': vectorizer.idf_.astype(np.float32),
+        'sublinear_tf': np.bool_(vectorizer.sublinear_tf),
+        'binary': np.bool_(vectorizer.binary),
+        'norm': np.array(vectorizer.norm or ''),
+        'linear_intercept': np.float32(intercept),
+    }
+    if forest is not None:
+        arrays.update(_forest_arrays(forest, precision))
+
+    # Linguistic weights multiply raw counts and lengths, so they stay float32
+    arrays['linear_ling'] = coef[n_tfidf:].astype(np.float32)
+    if precision == 'int8':
+        arrays['linear_coef'], arrays['linear_scale'] = _quantize(coef[:n_tfidf])
+    else:
+        arrays['linear_coef'] = coef[:n_tfidf].astype(np.float32)
+        arrays['linear_scale'] = np.float32(1.0)
+
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+class CompactModel:
+    """Loaded artifact: TF-IDF and scoring with plain float32/int8 arrays"""
+
+    def __init__(self, arrays):
+        self.precision = str(arrays['precision'])
+        self.classes = arrays['classes']
+        terms = arrays['vocabulary'].tobytes().decode('utf-8').split('\n')
+        self.vocabulary = {term: i for i, term in enumerate(terms)}
+        self.idf = arrays['idf']
+        self.sublinear_tf = bool(arrays['sublinear_tf'])
+        self.binary = bool(arrays['binary'])
+        self.norm = str(arrays['norm']) or None
+
+        self.coef = arrays['linear_coef']
+        self.coef_scale = float(arrays['linear_scale'])
+        self.ling_coef = arrays['linear_ling']
+        self.intercept = float(arrays['linear_intercept'])
+        self.n_tfidf = len(terms)
+
+        self.has_forest = 'forest_roots' in arrays
+        if self.has_forest:
+            self.node_feature = arrays['forest_feature']
+            self.node_threshold = arrays['forest_threshold']
+            self.node_left = arrays['forest_left']
+            self.node_right = arrays['forest_right']
+            self.node_value = arrays['forest_value']
+            self.roots = arrays['forest_roots']
+            self.depth = int(arrays['forest_depth'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            if int(saved['version']) != ARTIFACT_VERSION:
+                raise ValueError(f"Unsupported artifact version {int(saved['version'])}")
+            return cls({key: saved[key] for key in saved.files})
+
+    @property
+    def nbytes(self):
+        arrays = [self.idf, self.coef, self.ling_coef]
+        if self.has_forest:
+            arrays += [self.node_feature, self.node_threshold, self.node_left,
+                       self.node_right, self.node_value, self.roots]
+        return sum(a.nbytes for a in arrays)
+
+    def transform(self, docs):
+        """float32 TF-IDF rows for Documents (same steps as tfidf_transform)"""
+        vocabulary = self.vocabulary
+        indptr = [0]
+        indices = []
+        values = []
+        for doc in docs:
+            for token, count in doc.token_counts.items():
+                index = vocabulary.get(token)
+                if index is not None:
+                    indices.append(index)
+                    values.append(count)
+            indptr.append(len(indices))
+
+        indices = np.array(indices, dtype=np.int32)
+        data = np.array(values, dtype=np.float32)
+        if self.binary:
+            data[:] = 1
+        if self.sublinear_tf:
+            np.log(data, data)
+            data += 1
+        data *= self.idf[indices]
+
+        matrix = sparse.csr_matrix((data, indices, np.array(indptr)), shape=(len(docs), self.n_tfidf))
+        matrix.sort_indices()
+        if self.norm:
+            matrix = normalize(matrix, norm=self.norm, copy=False)
+        return matrix
+
+    def _weights(self, indices):
+        weights = self.coef[indices]
+        if self.coef.dtype == np.int8:
+            # Dequantize only the weights this request touches
+            return weights.astype(np.float32) * np.float32(self.coef_scale)
+        return weights
+
+    def _linear_proba(self, tfidf, ling):
+        rows = np.repeat(np.arange(tfidf.shape[0]), np.diff(tfidf.indptr))
+        products = tfidf.data * self._weights(tfidf.indices)
+        scores = np.bincount(rows, weights=products, minlength=tfidf.shape[0]) + self.intercept
+        if len(self.ling_coef):
+            scores += ling @ self.ling_coef
+        return 1.0 / (1.0 + np.exp(-scores))
+
+    def _forest_proba(self, dense):
+        """Walk every tree for every row at once, one level per step"""
+        rows = np.arange(dense.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (dense.shape[0], len(self.roots))).copy()
+        for _ in range(self.depth):
+            feature = self.node_feature[nodes]
+            split = feature >= 0
+            if not split.any():
+                break
+            go_left = dense[rows, np.maximum(feature, 0)] <= self.node_threshold[nodes]
+            nodes = np.where(go_left, self.node_left[nodes], self.node_right[nodes])
+        values = self.node_value[nodes]
+        if values.dtype == np.uint8:
+            return values.mean(axis=1) / 255
+        return values.mean(axis=1)
+
+    def predict_proba(self, tfidf, ling=None):
+        """Probability of classes[1] for each row"""
+        if ling is not None:
+            ling = np.asarray(ling, dtype=np.float32).reshape(tfidf.shape[0], -1)
+        proba = self._linear_proba(tfidf, ling)
+        if self.has_forest:
+            dense = np.hstack([tfidf.toarray(), ling]).astype(np.float32)
+            proba = (proba + self._forest_proba(dense)) / 2
+        return proba
+
+    def predict(self, tfidf, ling=None):
+        """(prediction, confidence) for a single row"""
+        proba = float(self.predict_proba(tfidf, ling)[0])
+        # Ties go to classes[0], as with argmax over predict_proba
+        prediction = self.classes[1] if proba > 0.5 else self.classes[0]
+        return prediction, max(proba, 1.0 - proba)
+
+
+def load(path):
+    """CompactModel from path, or None if the artifact is missing or unreadable"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return CompactModel.load(path)
+    except Exception as e:
+        print(f"Could not load {os.path.basename(path)}: {e}")
+        return None
+
+
+def refresh(model, vectorizer, model_path, precision, scaler=None):
+    """Re-export the compact artifacts of a retrained model.
+
+    Every precision already on disk is rewritten (or removed if the model
+    cannot be exported), so none keeps serving the old weights after a
+    restart. Returns the artifact for precision, None for float64.
+    """
+    for target in PRECISIONS[1:]:
+        path = artifact_path(model_path, target)
+        if target != precision and not os.path.exists(path):
+            continue
+        try:
+            export(model, vectorizer, path, target, scaler=scaler)
+        except ValueError as e:
+            print(f"Could not export {os.path.basename(path)}: {e}")
+            if os.path.exists(path):
+                os.remove(path)
+    return load(artifact_path(model_path, precision)) if precision != 'float64' else None
+
+
+def parity_report(reference, compact, texts, labels=None, ling=None):
+    """Compare a compact model with the sklearn model + vectorizer it came from.
+
+    reference is (model, vectorizer) or (model, vectorizer, scaler) for the
+    distilled variant; ling holds the linguistic feature rows for texts when
+    the model uses them. Reports verdict agreement, probability drift,
+    accuracy (when labels are given), weight bytes and scoring time.
+    """
+    model, vectorizer = reference[:2]
+    scaler = reference[2] if len(reference) > 2 else None
+
+    docs = [preprocess(text) for text in texts]
+    reference_proba = np.empty(len(docs))
+    compact_proba = np.empty(len(docs))
+    reference_time = compact_time = 0.0
+
+    for start in range(0, len(docs), PARITY_BATCH_SIZE):
+        end = start + PARITY_BATCH_SIZE
+        batch_ling = None if ling is None else np.asarray(ling[start:end], dtype=np.float64)
+
+        begin = time.perf_counter()
+        tfidf = vectorizer.transform([doc.text for doc in docs[start:end]])
+        if scaler is not None:
+            features = sparse.hstack([tfidf, scaler.transform(batch_ling)]).tocsr()
+        elif batch_ling is not None and isinstance(model, VotingClassifier):
+            features = np.hstack([tfidf.toarray(), batch_ling])
+        else:
+            features = tfidf
+        reference_proba[start:end] = model.predict_proba(features)[:, 1]
+        reference_time += time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        compact_proba[start:end] = compact.predict_proba(compact.transform(docs[start:end]), batch_ling)
+        compact_time += time.perf_counter() - begin
+
+    reference_pred = (reference_proba > 0.5).astype(int)
+    compact_pred = (compact_proba > 0.5).astype(int)
+    drift = np.abs(reference_proba - compact_proba)
+
+    report = {
+        'precision': compact.precision,
+        'articles': len(docs),
+        'agreement': float(np.mean(reference_pred == compact_pred)) if len(docs) else 1.0,
+        'max_proba_diff': float(drift.max()) if len(docs) else 0.0,
+        'mean_proba_diff': float(drift.mean()) if len(docs) else 0.0,
+        'weight_bytes': compact.nbytes,
+        'reference_ms': reference_time / max(len(docs), 1) * 1000,
+        'compact_ms': compact_time / max(len(docs), 1) * 1000,
+    }
+    if labels is not None:
+        labels = np.asarray(labels)
+        report['reference_accuracy'] = float(np.mean(model.classes_[reference_pred] == labels))
+        report['compact_accuracy'] = float(np.mean(compact.classes[compact_pred] == labels))
+    return report
+
+
+def format_report(name, report):
+    lines = [
+        f"{name} [{report['precision']}]: {report['agreement']:.2%} verdict agreement "
+        f"on {report['articles']} articles",
+        f"  probability drift: max {report['max_proba_diff']:.4f}, mean {report['mean_proba_diff']:.5f}",
+        f"  weights: {report['weight_bytes'] / 1024:.1f} KB, "
+        f"scoring: {report['reference_ms']:.3f} -> {report['compact_ms']:.3f} ms/article",
+    ]
+    if 'compact_accuracy' in report:
+        lines.append(f"  accuracy: {report['reference_accuracy']:.2%} -> {report['compact_accuracy']:.2%}")
+    return "\n".join(lines)
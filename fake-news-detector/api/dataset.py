@@ -0,0 +1,231 @@
+# dataset.py - Locate and load the labeled fake/true news corpus
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Rows decoded at a time by the pandas fallback reader
+CSV_CHUNK_ROWS = 2000
+
+SAMPLE_FAKE = [
+    "Aliens have landed on Earth according to secret NASA documents!",
+    "You won't believe this one weird trick that doctors hate!",
+    "The government is hiding a cure for cancer!",
+    "Celebrities are secretly lizard people!",
+    "5G towers are spreading the virus!",
+    "BREAKING: Shocking revelation will change everything!",
+    "This LEAKED document exposes the truth they don't want you to know!",
+]
+
+SAMPLE_TRUE = [
+    "The government announced a new policy to support farmers.",
+    "Scientists published research findings on climate change.",
+    "The president met with world leaders to discuss the economy.",
+    "Stock markets showed mixed results today.",
+    "Congress passed a new infrastructure bill.",
+    "Researchers at the university completed a five-year study.",
+    "The company reported quarterly earnings that met expectations.",
+]
+
+
+class TextColumn:
+    """Read-only column of strings kept as one UTF-8 buffer plus offsets.
+
+    Strings are decoded only when accessed, so N articles cost roughly the
+    size of their raw text instead of N Python str objects. take() returns a
+    view over the same buffer, which is how shuffles and splits avoid copies.
+    """
+
+    def __init__(self, data, offsets, index=None):
+        self._data = data
+        self._offsets = offsets
+        self._index = index
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    @classmethod
+    def concat(cls, columns):
+        """Join columns into one contiguous buffer (views are materialized)"""
+        parts, lengths = [], []
+        for column in columns:
+            starts, ends = column._bounds()
+            if column._index is None:
+                parts.append(column._data[column._offsets[0]:column._offsets[-1]])
+            else:
+                parts.extend(column._data[s:e] for s, e in zip(starts, ends))
+            lengths.append(ends - starts)
+        lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        data = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8)
+        return cls(data, offsets)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            return cls(saved['data'], saved['offsets'])
+
+    def save(self, path):
+        """Write the column as an .npz of its buffer and offsets"""
+        column = self if self._index is None else TextColumn.concat([self])
+        np.savez(path, data=column._data, offsets=column._offsets)
+
+    def _bounds(self):
+        rows = self._rows()
+        return self._offsets[rows], self._offsets[rows + 1]
+
+    def _rows(self):
+        if self._index is None:
+            return np.arange(len(self._offsets) - 1)
+        return self._index
+
+    def take(self, indices):
+        """View of the given rows, in the given order, sharing the buffer"""
+        indices = np.asarray(indices, dtype=np.int64)
+        if self._index is not None:
+            indices = self._index[indices]
+        return TextColumn(self._data, self._offsets, indices)
+
+    @property
+    def nbytes(self):
+        index_bytes = 0 if self._index is None else self._index.nbytes
+        return self._data.nbytes + self._offsets.nbytes + index_bytes
+
+    def __len__(self):
+        if self._index is None:
+            return len(self._offsets) - 1
+        return len(self._index)
+
+    def __getitem__(self, i):
+        row = i if self._index is None else self._index[i]
+        start, end = self._offsets[row], self._offsets[row + 1]
+        return self._data[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _arrow_batches(path, column):
+    """Yield (utf8 bytes, lengths) per record batch of one CSV column"""
+    reader = pa_csv.open_csv(path, convert_options=pa_csv.ConvertOptions(
+        include_columns=[column], column_types={column: pa.large_string()}
+    ))
+    for batch in reader:
+        array = pc.fill_null(batch.column(0), '')
+        _, offsets, data = array.buffers()
+        offsets = np.frombuffer(offsets, dtype=np.int64)[array.offset:array.offset + len(array) + 1]
+        yield memoryview(data)[offsets[0]:offsets[-1]], np.diff(offsets)
+
+
+def _pandas_batches(path, column):
+    """Yield (utf8 bytes, lengths) per chunk of one CSV column"""
+    reader = pd.read_csv(path, usecols=[column], dtype={column: str},
+                         keep_default_na=False, chunksize=CSV_CHUNK_ROWS)
+    for chunk in reader:
+        encoded = [text.encode('utf-8') for text in chunk[column]]
+        yield b''.join(encoded), np.array([len(b) for b in encoded], dtype=np.int64)
+
+
+def read_text_columns(paths, column='text'):
+    """Stream one column of several CSVs into a single TextColumn.
+
+    Only the requested column is parsed, batch by batch, and each batch is
+    appended to one growing buffer, so peak memory stays close to the size
+    of the raw text. Uses Arrow's CSV reader when pyarrow is installed,
+    otherwise pandas in chunks. Returns (TextColumn, rows per path).
+    """
+    read_batches = _arrow_batches if ARROW_AVAILABLE else _pandas_batches
+    buffer = bytearray()
+    lengths = []
+    counts = []
+    for path in paths:
+        rows = 0
+        for data, batch_lengths in read_batches(path, column):
+            buffer += data
+            lengths.append(batch_lengths)
+            rows += len(batch_lengths)
+        counts.append(rows)
+
+    lengths = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int64)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return TextColumn(np.frombuffer(buffer, dtype=np.uint8), offsets), counts
+
+
+def find_data_files():
+    """Return (fake_path, true_path) or (None, None) if the CSVs are missing"""
+    base_dir = os.path.dirname(__file__)
+    possible_paths = [
+        (os.path.join(base_dir, 'data', 'fake.csv'), os.path.join(base_dir, 'data', 'true.csv')),
+        (os.path.join(base_dir, '..', 'backend', 'data', 'fake.csv'), os.path.join(base_dir, '..', 'backend', 'data', 'true.csv')),
+    ]
+    for fake_path, true_path in possible_paths:
+        if os.path.exists(fake_path) and os.path.exists(true_path):
+            return fake_path, true_path
+    return None, None
+
+
+def load_training_data(sample_size=500, random_state=42):
+    """Load texts and labels (0 = fake, 1 = real), shuffled.
+
+    Returns (TextColumn, labels). sample_size caps the articles taken from
+    each CSV (None loads everything). Falls back to the built-in sample
+    articles when the CSVs are unavailable.
+    """
+    rng = np.random.RandomState(random_state)
+    fake_path, true_path = find_data_files()
+    try:
+        if not fake_path:
+            raise FileNotFoundError("CSV files not found")
+        print("Loading real datasets from CSV files...")
+        texts, (n_fake, n_true) = read_text_columns([fake_path, true_path])
+        fake_rows = np.arange(n_fake)
+        true_rows = np.arange(n_fake, n_fake + n_true)
+        if sample_size:
+            fake_rows = rng.choice(fake_rows, min(sample_size, n_fake), replace=False)
+            true_rows = rng.choice(true_rows, min(sample_size, n_true), replace=False)
+        print(f"Loaded {len(fake_rows)} fake news articles")
+        print(f"Loaded {len(true_rows)} true news articles")
+        texts = texts.take(np.concatenate([fake_rows, true_rows]))
+        if sample_size:
+            # Copy just the sampled articles so the full buffer can be freed
+            texts = TextColumn.concat([texts])
+    except Exception as e:
+        print(f"Using sample data ({e})")
+        texts = TextColumn.from_strings(SAMPLE_FAKE + SAMPLE_TRUE)
+        fake_rows, true_rows = SAMPLE_FAKE, SAMPLE_TRUE
+
+    labels = np.array([0] * len(fake_rows) + [1] * len(true_rows))
+
+    # Shuffle by index; the text buffer itself is never copied
+    order = rng.permutation(len(texts))
+    return texts.take(order), labels[order]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unknown)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
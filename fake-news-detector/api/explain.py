@@ -0,0 +1,198 @@
+# explain.py - Per-prediction explanations from precomputed weight indexes
+import os
+
+import numpy as np
+
+import compact as compact_module
+
+# Terms/features returned per explanation
+DEFAULT_TOP_K = int(os.environ.get('EXPLAIN_TOP_K', 10))
+
+
+def top_k(names, values, k=DEFAULT_TOP_K):
+    """The k largest contributions by magnitude, largest first"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) > k:
+        picked = np.argpartition(-np.abs(values), k)[:k]
+    else:
+        picked = np.arange(len(values))
+    picked = picked[np.argsort(-np.abs(values[picked]), kind='stable')]
+    return [
+        {
+            'feature': str(names[i]),
+            'contribution': round(float(values[i]), 4),
+            # Positive contributions push toward class 1 (REAL)
+            'direction': 'REAL' if values[i] > 0 else 'FAKE',
+        }
+        for i in picked if values[i] != 0
+    ]
+
+
+class LinearExplainer:
+    """Contribution coef[j] * x[j] of every nonzero feature to the log-odds.
+
+    Weights are indexed by vocabulary column, so a request only touches the
+    weights of its own nonzero TF-IDF entries plus the linguistic features.
+    """
+
+    units = 'log-odds'
+
+    def __init__(self, coef, terms, intercept, ling_coef=()):
+        self.coef = np.asarray(coef, dtype=np.float32)
+        self.terms = np.asarray(terms, dtype=object)
+        self.intercept = float(intercept)
+        self.ling_coef = np.asarray(ling_coef, dtype=np.float32)
+
+    @classmethod
+    def from_model(cls, model, vectorizer, scaler=None):
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        coef, intercept = compact_module._linear_arrays(model, len(terms), scaler)
+        return cls(coef[:len(terms)], terms, intercept, coef[len(terms):])
+
+    @classmethod
+    def from_compact(cls, model):
+        terms = sorted(model.vocabulary, key=model.vocabulary.get)
+        coef = model.coef.astype(np.float32) * np.float32(model.coef_scale)
+        return cls(coef, terms, model.intercept, model.ling_coef)
+
+    def contributions(self, tfidf, ling=None):
+        """(names, values) for the nonzero entries of a single TF-IDF row"""
+        names = self.terms[tfidf.indices]
+        values = tfidf.data * self.coef[tfidf.indices]
+        if ling and len(self.ling_coef):
+            names = np.concatenate([names, np.asarray(list(ling), dtype=object)])
+            values = np.concatenate([values, np.fromiter(ling.values(), dtype=np.float32) * self.ling_coef])
+        return names, values
+
+    def explain(self, tfidf, ling=None, k=DEFAULT_TOP_K):
+        names, values = self.contributions(tfidf, ling)
+        return {'units': self.units, 'bias': round(self.intercept, 4), 'top_features': top_k(names, values, k)}
+
+
+class ForestExplainer:
+    """Path contributions of a random forest (Saabas' method).
+
+    Each node caches how much reaching it changed the class-1 probability
+    relative to its parent, keyed by the parent's split feature. A prediction
+    is the root mean plus the sum of those changes along each tree's path,
+    so explaining costs one walk of depth ~max_depth per tree.
+    """
+
+    units = 'probability'
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.roots = roots
+        self.depth = depth
+
+        # int8 artifacts store leaf probabilities as 0..255
+        value = value / np.float32(255) if value.dtype == np.uint8 else value.astype(np.float32)
+        inner = np.flatnonzero(feature >= 0)
+        self.parent_feature = np.full(len(feature), -1, dtype=np.int32)
+        self.delta = np.zeros(len(feature), dtype=np.float32)
+        for children in (left[inner], right[inner]):
+            self.parent_feature[children] = feature[inner]
+            self.delta[children] = value[children] - value[inner]
+        self.bias = float(value[roots].mean())
+
+        # Requests are mapped onto the features the forest splits on, so a
+        # walk touches an array of that size rather than the vocabulary's
+        self.split_features = np.unique(feature[inner])
+        self.slot = np.searchsorted(self.split_features, feature).clip(0, max(len(self.split_features) - 1, 0))
+        self.parent_slot = np.searchsorted(self.split_features, self.parent_feature)
+
+    @classmethod
+    def from_model(cls, forest):
+        arrays = compact_module._forest_arrays(forest, 'float32')
+        return cls(arrays['forest_feature'], arrays['forest_threshold'], arrays['forest_left'],
+                   arrays['forest_right'], arrays['forest_value'], arrays['forest_roots'],
+                   int(arrays['forest_depth']))
+
+    @classmethod
+    def from_compact(cls, model):
+        return cls(model.node_feature, model.node_threshold, model.node_left, model.node_right,
+                   model.node_value, model.roots, model.depth)
+
+    def contributions(self, indices, values):
+        """(feature indices, values) summed over every tree's decision path.
+
+        The row is given sparsely, as feature indices and their values;
+        features not listed are 0.0.
+        """
+        split_values = np.zeros(len(self.split_features) + 1, dtype=np.float32)
+        pos = np.searchsorted(self.split_features, indices)
+        hit = pos < len(self.split_features)
+        hit[hit] = self.split_features[pos[hit]] == indices[hit]
+        split_values[pos[hit]] = values[hit]
+
+        nodes = self.roots.copy()
+        visited = []
+        for _ in range(self.depth):
+            feature = self.feature[nodes]
+            if not (feature >= 0).any():
+                break
+            go_left = split_values[self.slot[nodes]] <= self.threshold[nodes]
+            moved = np.where(go_left, self.left[nodes], self.right[nodes])
+            visited.append(moved[moved != nodes])
+            nodes = moved
+        visited = np.concatenate(visited) if visited else np.zeros(0, dtype=np.int32)
+        totals = np.bincount(self.parent_slot[visited], weights=self.delta[visited],
+                             minlength=len(self.split_features)) / len(self.roots)
+        used = np.flatnonzero(totals)
+        return self.split_features[used], totals[used]
+
+
+class EnsembleExplainer:
+    """Soft-voting LR + forest, both on the probability scale.
+
+    The linear log-odds contributions are scaled by p * (1 - p), the slope
+    of the sigmoid at the model's output, and each member counts for half.
+    """
+
+    units = 'probability'
+
+    def __init__(self, linear, forest):
+        self.linear = linear
+        self.forest = forest
+
+    def explain(self, tfidf, ling=None, k=DEFAULT_TOP_K):
+        ling = ling or {}
+        names, values = self.linear.contributions(tfidf, ling)
+        p = 1.0 / (1.0 + np.exp(-(self.linear.intercept + float(values.sum()))))
+
+        totals = {}
+        for name, value in zip(names, values * (p * (1 - p) / 2)):
+            totals[name] = totals.get(name, 0.0) + value
+
+        # The forest walks the sparse row: TF-IDF entries, then the
+        # linguistic features at columns n_tfidf onward
+        n_tfidf = len(self.linear.terms)
+        indices = np.concatenate([tfidf.indices, np.arange(n_tfidf, n_tfidf + len(ling))])
+        row = np.concatenate([tfidf.data, np.fromiter(ling.values(), dtype=np.float64, count=len(ling))]).astype(np.float32)
+        ling_names = list(ling)
+        for index, value in zip(*self.forest.contributions(indices, row)):
+            name = self.linear.terms[index] if index < n_tfidf else ling_names[index - n_tfidf]
+            totals[name] = totals.get(name, 0.0) + value / 2
+
+        bias = (p - float(values.sum()) * p * (1 - p) + self.forest.bias) / 2
+        return {
+            'units': self.units,
+            'bias': round(float(bias), 4),
+            'top_features': top_k(list(totals), list(totals.values()), k),
+        }
+
+
+def build_explainer(model=None, vectorizer=None, scaler=None, compact=None):
+    """Explainer for a loaded detector's model (compact artifact first)"""
+    if compact is not None:
+        linear = LinearExplainer.from_compact(compact)
+        return EnsembleExplainer(linear, ForestExplainer.from_compact(compact)) if compact.has_forest else linear
+    if model is None or vectorizer is None:
+        return None
+    if hasattr(model, 'named_estimators_'):
+        linear = LinearExplainer.from_model(model.named_estimators_['lr'], vectorizer)
+        return EnsembleExplainer(linear, ForestExplainer.from_model(model.named_estimators_['rf']))
+    return LinearExplainer.from_model(model, vectorizer, scaler)
@@ -0,0 +1,205 @@
+# feature_store.py - On-disk cache of tokenized corpora and feature matrices for training
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from dataset import TextColumn
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'FEATURE_CACHE_DIR',
+    os.path.join(os.path.dirname(__file__), '.feature_cache')
+)
+
+# Vectorizer parameters that change how a document is turned into tokens.
+# Everything else (max_features, min_df, norm, ...) only changes the vocabulary
+# and weighting, so it can be refit from cached tokens.
+TOKENIZER_PARAMS = (
+    'analyzer', 'decode_error', 'encoding', 'input', 'lowercase', 'ngram_range',
+    'preprocessor', 'stop_words', 'strip_accents', 'token_pattern', 'tokenizer',
+)
+
+
+# Cached token lists are stored as one joined string per document inside a
+# TextColumn, which costs about as much memory as the raw text instead of one
+# Python str per token. Word tokens never contain this separator.
+TOKEN_SEPARATOR = '\x1f'
+
+
+def _split_tokens(joined):
+    return joined.split(TOKEN_SEPARATOR) if joined else []
+
+
+def _digest(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _token_vectorizer(params):
+    """Vectorizer with the same weighting that consumes pre-tokenized documents"""
+    weighting = {k: v for k, v in params.items() if k not in TOKENIZER_PARAMS}
+    return TfidfVectorizer(analyzer=_split_tokens, **weighting)
+
+
+def _inference_vectorizer(params, fitter):
+    """Transplant a token vectorizer's vocabulary and IDF weights into a
+    vectorizer that tokenizes raw text, which is what gets shipped"""
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = fitter.vocabulary_
+    vectorizer.idf_ = fitter.idf_
+    return vectorizer
+
+
+class FeatureStore:
+    """Cache each training stage on disk, keyed by dataset hash and stage config.
+
+    Stages:
+      tokens     - tokenized corpus            (dataset hash + tokenizer config)
+      tfidf      - fitted vectorizer + .npz    (tokens key + vectorizer config)
+      transform  - .npz for held-out texts     (tokens key + fitted vectorizer)
+      linguistic - dense feature matrix .npy   (dataset hash + extractor version)
+
+    A stage is only recomputed when one of its inputs changed.
+    """
+
+    def __init__(self, cache_dir=None, enabled=True):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.enabled = enabled
+        self._tokens = {}
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, stage, key, ext):
+        return os.path.join(self.cache_dir, f"{stage}-{key}.{ext}")
+
+    def _hit(self, *paths):
+        return self.enabled and all(os.path.exists(p) for p in paths)
+
+    def dataset_hash(self, texts):
+        """Content hash of an ordered collection of documents"""
+        h = hashlib.sha1()
+        for text in texts:
+            h.update(str(text).encode('utf-8', 'surrogatepass'))
+            h.update(b'\0')
+        return h.hexdigest()[:16]
+
+    def tokens(self, texts, params):
+        """Tokenize each document once with the vectorizer's analyzer.
+
+        Returns (TextColumn of separator-joined tokens, cache key).
+        """
+        params = TfidfVectorizer(**params).get_params()
+        tokenizer_config = {k: params[k] for k in TOKENIZER_PARAMS}
+        key = _digest('tokens', self.dataset_hash(texts), tokenizer_config)
+        path = self._path('tokens', key, 'npz')
+
+        if key in self._tokens:
+            return self._tokens[key], key
+
+        if self._hit(path):
+            print(f"Reusing cached tokens ({key})")
+            tokens = TextColumn.load(path)
+        else:
+            analyze = TfidfVectorizer(**params).build_analyzer()
+            tokens = TextColumn.from_strings(TOKEN_SEPARATOR.join(analyze(text)) for text in texts)
+            if self.enabled:
+                tokens.save(path)
+
+        self._tokens[key] = tokens
+        return tokens, key
+
+    def fit_tfidf(self, texts, params):
+        """Return a fitted TfidfVectorizer and the TF-IDF matrix of texts"""
+        params = TfidfVectorizer(**params).get_params()
+        tokens, tokens_key = self.tokens(texts, params)
+        key = _digest('tfidf', tokens_key, params)
+        vectorizer_path = self._path('vectorizer', key, 'joblib')
+        matrix_path = self._path('tfidf', key, 'npz')
+
+        if self._hit(vectorizer_path, matrix_path):
+            print(f"Reusing cached TF-IDF matrix ({key})")
+            return joblib.load(vectorizer_path), sparse.load_npz(matrix_path)
+
+        fitter = _token_vectorizer(params)
+        matrix = fitter.fit_transform(tokens)
+        vectorizer = _inference_vectorizer(params, fitter)
+
+        if self.enabled:
+            joblib.dump(vectorizer, vectorizer_path)
+            sparse.save_npz(matrix_path, matrix)
+        return vectorizer, matrix
+
+    def fit_tfidf_subset(self, texts, params, train_index, test_index):
+        """Fit on texts[train_index] and transform texts[test_index].
+
+        Tokens come from the cached full corpus, so every cross-validation
+        fold and every vectorizer config reuses a single tokenization pass.
+        Returns (vectorizer, X_train, X_test).
+        """
+        params = TfidfVectorizer(**params).get_params()
+        tokens, tokens_key = self.tokens(texts, params)
+        train_index = np.asarray(train_index, dtype=np.int64)
+        test_index = np.asarray(test_index, dtype=np.int64)
+        split = hashlib.sha1(train_index.tobytes() + b'|' + test_index.tobytes()).hexdigest()
+        key = _digest('subset', tokens_key, params, split)
+        vectorizer_path = self._path('vectorizer', key, 'joblib')
+        train_path = self._path('tfidf', key + '-train', 'npz')
+        test_path = self._path('tfidf', key + '-test', 'npz')
+
+        if self._hit(vectorizer_path, train_path, test_path):
+            return (joblib.load(vectorizer_path),
+                    sparse.load_npz(train_path), sparse.load_npz(test_path))
+
+        fitter = _token_vectorizer(params)
+        X_train = fitter.fit_transform(tokens.take(train_index))
+        X_test = fitter.transform(tokens.take(test_index))
+        vectorizer = _inference_vectorizer(params, fitter)
+
+        if self.enabled:
+            joblib.dump(vectorizer, vectorizer_path)
+            sparse.save_npz(train_path, X_train)
+            sparse.save_npz(test_path, X_test)
+        return vectorizer, X_train, X_test
+
+    def transform_tfidf(self, texts, vectorizer):
+        """TF-IDF matrix of texts under an already fitted vectorizer"""
+        params = vectorizer.get_params()
+        tokens, tokens_key = self.tokens(texts, params)
+        fitted = _digest(sorted(vectorizer.vocabulary_.items()), vectorizer.idf_.tolist())
+        key = _digest('transform', tokens_key, params, fitted)
+        matrix_path = self._path('tfidf', key, 'npz')
+
+        if self._hit(matrix_path):
+            print(f"Reusing cached TF-IDF matrix ({key})")
+            return sparse.load_npz(matrix_path)
+
+        transformer = _token_vectorizer(params)
+        transformer.vocabulary_ = vectorizer.vocabulary_
+        transformer.idf_ = vectorizer.idf_
+        matrix = transformer.transform(tokens)
+
+        if self.enabled:
+            sparse.save_npz(matrix_path, matrix)
+        return matrix
+
+    def linguistic(self, texts, extractor, config):
+        """Dense matrix of extractor(text) values, one row per document.
+
+        config must identify the extractor's output (e.g. a version string and
+        any feature flags), since the cache cannot see inside the function.
+        """
+        key = _digest('linguistic', self.dataset_hash(texts), config)
+        path = self._path('linguistic', key, 'npy')
+
+        if self._hit(path):
+            print(f"Reusing cached linguistic features ({key})")
+            return np.load(path)
+
+        matrix = np.array([list(extractor(text).values()) for text in texts], dtype=float)
+        if self.enabled:
+            np.save(path, matrix)
+        return matrix
@@ -0,0 +1,32 @@
+# features.py - Lightweight text-style features shared by serving and monitoring
+from preprocess import preprocess
+
+
+def extract_ai_features(text):
+    """Extract AI features without heavy dependencies"""
+    features = {}
+    # Shared, memoized tokenization and character statistics
+    doc = preprocess(text)
+    
+    # Text statistics
+    features['text_length'] = doc.length
+    features['word_count'] = len(doc.words)
+    features['avg_word_length'] = sum(map(len, doc.words)) / (len(doc.words) or 1)
+    
+    # Punctuation and capitalization patterns (fake news often has excessive punctuation/caps)
+    features['exclamation_count'] = doc.exclamation_count
+    features['question_count'] = doc.question_count
+    features['caps_ratio'] = doc.upper_count / (doc.length or 1)
+    features['digit_ratio'] = doc.digit_count / (doc.length or 1)
+    
+    # Clickbait indicators
+    clickbait_words = ['shocking', 'unbelievable', 'you wont believe', 'you won\'t believe', 
+                      'this one trick', 'doctors hate', 'secret', 'revealed', 'exposed']
+    features['clickbait_score'] = doc.contains_count(clickbait_words)
+    
+    # Sensationalism indicators
+    sensational_words = ['breaking', 'urgent', 'alert', 'warning', 'exclusive', 'leaked', 
+                        'bombshell', 'scandal']
+    features['sensational_score'] = doc.contains_count(sensational_words)
+    
+    return features
@@ -6,24 +6,54 @@ import os
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from model import FakeNewsDetector
+from model import get_detector
+from cascade import CascadeDetector, TIER_ENSEMBLE
+from admission import AdmissionController, client_id, install, limit
+from scoring import get_scorer
+from links import link_analysis
+import profiling
+from profiling import profiled, stage
 
 app = Flask(__name__)
 CORS(app)
 
 # Initialize detector globally
-detector = FakeNewsDetector()
+detector = get_detector()
+cascade = CascadeDetector(fast_detector=detector)
+monitor = detector.enable_monitoring()
+
+# Set ANALYZE_MODE=cascade to serve the cascade by default
+DEFAULT_MODE = os.environ.get('ANALYZE_MODE', 'standard')
+
+# Bounded concurrency and queueing; retraining runs alone and is never queued
+analyze_admission = AdmissionController('analyze')
+train_admission = AdmissionController('train', max_concurrent=1, max_queue=0, max_per_client=1)
+install(app, [analyze_admission, train_admission])
+# GET /admin/profiles: slowest requests profiled via X-Profile or sampling
+profiling.install(app)
 
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'ok', 'message': 'Fake News Detector API running'})
 
+@app.route('/monitoring', methods=['GET'])
+def monitoring():
+    return jsonify(monitor.report())
+
+@app.route('/scoring', methods=['GET'])
+def scoring():
+    # Per-model agreement with the primary model and A/B traffic served
+    return jsonify(get_scorer().metrics())
+
 @app.route('/train', methods=['POST'])
+@limit(train_admission)
 def train_model():
     detector.train()
     return jsonify({'message': 'Model retrained successfully'})
 
 @app.route('/analyze', methods=['POST'])
+@limit(analyze_admission)
+@profiled('analyze', detector)
 def analyze():
     data = request.json
     text = data.get('text', '').strip()
@@ -31,17 +61,50 @@ def analyze():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
 
-    prediction, confidence = detector.predict(text)
+    mode = data.get('mode', DEFAULT_MODE)
+    if mode == 'multi':
+        return analyze_multi(text, data)
+    if mode == 'cascade':
+        prediction, confidence, tier = cascade.predict(text)
+    else:
+        prediction, confidence = detector.predict(text)
+        tier = None
+    answered_by = cascade.ensemble_detector if tier == TIER_ENSEMBLE else detector
 
     if prediction is None:
         return jsonify({'error': 'Model not loaded'}), 500
 
     result = {
         "prediction": "FAKE" if prediction == 0 else "REAL",
-        "confidence": round(confidence, 2)
+        "confidence": round(float(confidence), 2)
     }
+    if tier:
+        result["tier"] = tier
+    if tier == TIER_ENSEMBLE:
+        # Escalated articles also get their links checked
+        result["links"], result["link_summary"] = link_analysis(text)
+    if data.get('explain'):
+        with stage('explain'):
+            result["explanation"] = answered_by.explain(text)
 
     return jsonify(result)
 
+def analyze_multi(text, data):
+    """Every registered model's score from one feature pass (SCORING_MODELS)"""
+    scorer = get_scorer()
+    # Clients stay on the same A/B arm across requests
+    result = scorer.score(text, key=client_id(request))
+    if result is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+
+    result['confidence'] = round(result['confidence'], 2)
+    if data.get('explain'):
+        with stage('explain'):
+            result["explanation"] = scorer.get(result['model']).detector.explain(text)
+    return jsonify(result)
+
 # Vercel serverless handler
 app = app
+
+if __name__ == '__main__':
+    app.run(port=int(os.environ.get('PORT', 5000)))
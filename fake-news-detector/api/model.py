@@ -1,128 +1,142 @@
 # model.py
-import pandas as pd
+import numpy as np
 import joblib
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 import os
+import threading
+from feature_store import FeatureStore
+from dataset import load_training_data
+from preprocess import preprocess, tfidf_transform
+import compact
+from explain import DEFAULT_TOP_K, build_explainer
+from monitoring import build_baseline, get_monitor, load_baseline, save_baseline
+from profiling import stage
+
+TFIDF_PARAMS = {'stop_words': 'english', 'max_features': 5000}
 
 class FakeNewsDetector:
-    def __init__(self):
+    def __init__(self, precision=None):
         # Update paths for Vercel deployment
         base_dir = os.path.dirname(__file__)
         self.model_path = os.path.join(base_dir, "fake_news_model.pkl")
         self.vectorizer_path = os.path.join(base_dir, "tfidf_vectorizer.pkl")
+        self.baseline_path = os.path.join(base_dir, "monitoring_baseline.json")
+        self.precision = precision or compact.DEFAULT_PRECISION
         self.model = None
         self.vectorizer = None
+        self.compact = None
+        self.explainer = None
+        self.monitor = None
         self.load_model()
 
-    def train(self):
-        # Load real datasets from CSV files
-        try:
-            base_dir = os.path.dirname(__file__)
-            
-            # Try multiple paths to find the data files
-            possible_paths = [
-                (os.path.join(base_dir, 'data', 'fake.csv'), os.path.join(base_dir, 'data', 'true.csv')),
-                (os.path.join(base_dir, '..', 'backend', 'data', 'fake.csv'), os.path.join(base_dir, '..', 'backend', 'data', 'true.csv')),
-            ]
-            
-            fake_path = None
-            true_path = None
-            
-            for fp, tp in possible_paths:
-                if os.path.exists(fp) and os.path.exists(tp):
-                    fake_path = fp
-                    true_path = tp
-                    break
-            
-            # If files don't exist, use fallback sample data
-            if not fake_path or not true_path:
-                print("CSV files not found, using sample data")
-                fake_df = pd.DataFrame({
-                    'text': [
-                        "Aliens have landed on Earth according to secret NASA documents!",
-                        "You won't believe this one weird trick that doctors hate!",
-                        "The government is hiding a cure for cancer!",
-                        "Celebrities are secretly lizard people!",
-                        "5G towers are spreading the virus!"
-                    ]
-                })
-                true_df = pd.DataFrame({
-                    'text': [
-                        "The government announced a new policy to support farmers.",
-                        "Scientists published research findings on climate change.",
-                        "The president met with world leaders to discuss economy.",
-                        "Stock markets showed mixed results today.",
-                        "Congress passed a new infrastructure bill."
-                    ]
-                })
-            else:
-                print("Loading real datasets from CSV files...")
-                # Load the CSV files
-                fake_df = pd.read_csv(fake_path)
-                true_df = pd.read_csv(true_path)
-                
-                # Use only the 'text' column and sample 500 from each for performance
-                fake_df = fake_df[['text']].sample(n=min(500, len(fake_df)), random_state=42)
-                true_df = true_df[['text']].sample(n=min(500, len(true_df)), random_state=42)
-                
-                print(f"Loaded {len(fake_df)} fake news articles")
-                print(f"Loaded {len(true_df)} true news articles")
-            
-            # Add labels
-            fake_df['label'] = 0  # Fake
-            true_df['label'] = 1  # Real
-            
-            # Combine datasets
-            df = pd.concat([fake_df, true_df], ignore_index=True)
-            
-            # Shuffle the data
-            df = df.sample(frac=1, random_state=42).reset_index(drop=True)
-            
-            print(f"Total training samples: {len(df)}")
-            
-        except Exception as e:
-            print(f"Error loading CSV files: {e}")
-            print("Using minimal fallback data")
-            # Fallback to minimal sample data
-            df = pd.DataFrame({
-                'text': [
-                    "The government announced a new policy to support farmers.",
-                    "Aliens have landed on Earth according to secret NASA documents!",
-                    "Scientists discovered a cure for cancer after decades of research.",
-                    "A man claims to have seen a dragon flying over the city.",
-                ],
-                'label': [1, 0, 1, 0]
-            })
-
-        X_train, X_test, y_train, y_test = train_test_split(
-            df['text'], df['label'], test_size=0.2, random_state=42
+    def train(self, feature_store=None, sample_size=500):
+        # Texts stay in one compact buffer; shuffling and splitting only
+        # move index arrays around
+        texts, labels = load_training_data(sample_size=sample_size)
+        print(f"Total training samples: {len(texts)}")
+
+        train_index, test_index = train_test_split(
+            np.arange(len(texts)), test_size=0.2, random_state=42
         )
+        X_train, X_test = texts.take(train_index), texts.take(test_index)
+        y_train, y_test = labels[train_index], labels[test_index]
 
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-        X_train_tfidf = self.vectorizer.fit_transform(X_train)
+        # Tokens and the TF-IDF matrix are reused from the feature store
+        # when neither the training texts nor TFIDF_PARAMS have changed
+        store = feature_store or FeatureStore()
+        self.vectorizer, X_train_tfidf = store.fit_tfidf(X_train, TFIDF_PARAMS)
 
         self.model = LogisticRegression(max_iter=1000)
         self.model.fit(X_train_tfidf, y_train)
+        self.explainer = None
 
         # Save model and vectorizer
         joblib.dump(self.model, self.model_path)
         joblib.dump(self.vectorizer, self.vectorizer_path)
+        # Compact artifacts would otherwise keep serving the old weights
+        self.compact = compact.refresh(self.model, self.vectorizer, self.model_path, self.precision)
+
+        # Distribution live traffic is compared against, taken from the
+        # held-out split so confidences are not inflated by training fit
+        proba = self.model.predict_proba(store.transform_tfidf(X_test, self.vectorizer))
+        save_baseline(self.baseline_path, build_baseline(
+            X_test, self.model.classes_[proba.argmax(axis=1)], proba.max(axis=1), self.vectorizer.vocabulary_
+        ))
+        if self.monitor is not None:
+            self.monitor.reset(load_baseline(self.baseline_path), self.vectorizer.vocabulary_)
         print("Model trained and saved successfully.")
 
+    def export_compact(self, precision='float32', texts=None, labels=None):
+        """Write the reduced-precision artifact and return its parity report"""
+        path = compact.export(self.model, self.vectorizer, compact.artifact_path(self.model_path, precision), precision)
+        if texts is None:
+            texts, labels = load_training_data()
+        return compact.parity_report((self.model, self.vectorizer), compact.load(path), texts, labels)
+
     def load_model(self):
+        self.explainer = None
+        if self.precision != 'float64':
+            # The compact artifact replaces both pickles when present
+            self.compact = compact.load(compact.artifact_path(self.model_path, self.precision))
+            if self.compact is not None:
+                return
         try:
             self.model = joblib.load(self.model_path)
             self.vectorizer = joblib.load(self.vectorizer_path)
         except:
             print("Model not found. Please train first by calling train().")
 
+    def enable_monitoring(self):
+        """Feed every predict() into the process-wide drift monitor"""
+        vocabulary = self.compact.vocabulary if self.compact is not None else getattr(self.vectorizer, 'vocabulary_', None)
+        self.monitor = get_monitor(self.baseline_path, vocabulary)
+        return self.monitor
+
     def predict(self, text):
-        if not self.model or not self.vectorizer:
+        if self.compact is not None:
+            with stage('features'):
+                features = self.compact.transform([preprocess(text)])
+            with stage('model'):
+                prediction, confidence = self.compact.predict(features)
+        elif not self.model or not self.vectorizer:
             return None, 0.0
+        else:
+            with stage('features'):
+                features = tfidf_transform(self.vectorizer, [preprocess(text)])
+            with stage('model'):
+                prediction = self.model.predict(features)[0]
+                confidence = max(self.model.predict_proba(features)[0])
 
-        features = self.vectorizer.transform([text])
-        prediction = self.model.predict(features)[0]
-        confidence = max(self.model.predict_proba(features)[0])
+        if self.monitor is not None:
+            with stage('monitor'):
+                self.monitor.observe_prediction(text, prediction, confidence)
         return prediction, confidence
+
+    def explain(self, text, k=DEFAULT_TOP_K):
+        """Top-k terms behind the verdict on text, or None without a model"""
+        if self.explainer is None:
+            self.explainer = build_explainer(self.model, self.vectorizer, compact=self.compact)
+        if self.explainer is None:
+            return None
+
+        doc = preprocess(text)
+        if self.compact is not None:
+            features = self.compact.transform([doc])
+        else:
+            features = tfidf_transform(self.vectorizer, [doc])
+        return self.explainer.explain(features, k=k)
+
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector(precision=None):
+    """Process-wide FakeNewsDetector, so endpoints served together share one warm model"""
+    precision = precision or compact.DEFAULT_PRECISION
+    with _detectors_lock:
+        detector = _detectors.get(precision)
+        if detector is None:
+            detector = _detectors[precision] = FakeNewsDetector(precision)
+        return detector
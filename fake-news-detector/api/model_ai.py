@@ -1,100 +1,135 @@
 # model_ai.py - Lightweight AI-powered fake news detector (Vercel compatible)
-import pandas as pd
+import hashlib
 import numpy as np
 import joblib
 import os
 import re
+import threading
+import time
+from scipy import sparse
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier, VotingClassifier
 from sklearn.metrics import accuracy_score
+from sklearn.preprocessing import StandardScaler
+from feature_store import FeatureStore
+from dataset import load_training_data
+from preprocess import preprocess, tfidf_transform
+import compact
+from explain import DEFAULT_TOP_K, build_explainer
+from monitoring import build_baseline, get_monitor, load_baseline, save_baseline
+from profiling import stage
+import sentiment
 
-# Lightweight AI imports (no torch/transformers for Vercel)
-try:
-    import nltk
-    from textblob import TextBlob
-    ADVANCED_FEATURES = True
-    
-    # Download required NLTK data
+# Sentiment comes from the built-in lexicon scorer. Set SENTIMENT_BACKEND=textblob
+# to opt into TextBlob/NLTK instead (falls back to the lexicon if not installed).
+SENTIMENT_BACKEND = os.environ.get('SENTIMENT_BACKEND', 'lexicon')
+
+if SENTIMENT_BACKEND == 'textblob':
     try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
+        import nltk
+        from textblob import TextBlob
+        
+        # Download required NLTK data
         try:
-            nltk.download('punkt', quiet=True)
-        except:
-            pass
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
+            nltk.data.find('tokenizers/punkt')
+        except LookupError:
+            try:
+                nltk.download('punkt', quiet=True)
+            except:
+                pass
         try:
-            nltk.download('stopwords', quiet=True)
-        except:
-            pass
-        
-except ImportError:
-    ADVANCED_FEATURES = False
+            nltk.data.find('corpora/stopwords')
+        except LookupError:
+            try:
+                nltk.download('stopwords', quiet=True)
+            except:
+                pass
+            
+    except ImportError:
+        print("TextBlob not installed, using the built-in sentiment lexicon")
+        SENTIMENT_BACKEND = 'lexicon'
+
+TFIDF_PARAMS = {'stop_words': 'english', 'max_features': 5000}
+
+# Bump whenever extract_linguistic_features changes, so cached feature
+# matrices from older training runs are not reused
+LINGUISTIC_FEATURES_VERSION = 3
+
+CLICKBAIT_WORDS = ['shocking', 'unbelievable', 'you wont believe', 'this one trick',
+                   'doctors hate', 'secret', 'revealed', 'exposed']
+SENSATIONAL_WORDS = ['breaking', 'urgent', 'alert', 'warning', 'exclusive', 'leaked']
+
+# 'ensemble' serves the LR + random forest voter; 'distilled' serves the single
+# sparse logistic model fit on the ensemble's soft labels (see distill())
+VARIANTS = ('ensemble', 'distilled')
+DEFAULT_VARIANT = os.environ.get('AI_MODEL_VARIANT', 'ensemble')
+
+# Rows scored per teacher batch while distilling (dense features are large)
+DISTILL_BATCH_SIZE = 1000
+
+
+def _fingerprint(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
 
 
 class AIFakeNewsDetector:
-    def __init__(self):
+    def __init__(self, variant=None, precision=None):
         base_dir = os.path.dirname(__file__)
         self.model_path = os.path.join(base_dir, "fake_news_model_ai.pkl")
         self.vectorizer_path = os.path.join(base_dir, "tfidf_vectorizer_ai.pkl")
+        self.distilled_path = os.path.join(base_dir, "fake_news_model_ai_distilled.pkl")
+        self.baseline_path = os.path.join(base_dir, "monitoring_baseline_ai.json")
+        
+        self.variant = variant or DEFAULT_VARIANT
+        if self.variant not in VARIANTS:
+            raise ValueError(f"Unknown model variant {self.variant!r}, expected one of {VARIANTS}")
+        self.precision = precision or compact.DEFAULT_PRECISION
         
         self.model = None
         self.vectorizer = None
+        self.scaler = None
+        self.compact = None
+        self.explainer = None
+        self.monitor = None
+        # Fingerprints of the articles train() fit the ensemble on; distill()
+        # keeps them out of its holdout
+        self.teacher_texts = None
         
         self.load_model()
 
-    def extract_linguistic_features(self, text):
+    @staticmethod
+    def extract_linguistic_features(text):
         """Extract advanced linguistic features for better generalization"""
         features = {}
-        
-        if not ADVANCED_FEATURES:
-            # Basic features without external libraries
-            features['text_length'] = len(text)
-            features['word_count'] = len(text.split())
-            features['avg_word_length'] = np.mean([len(word) for word in text.split()] or [0])
-            features['exclamation_count'] = text.count('!')
-            features['question_count'] = text.count('?')
-            features['caps_ratio'] = sum(1 for c in text if c.isupper()) / (len(text) or 1)
-            features['digit_ratio'] = sum(1 for c in text if c.isdigit()) / (len(text) or 1)
-            
-            clickbait_words = ['shocking', 'unbelievable', 'you wont believe', 'this one trick', 
-                             'doctors hate', 'secret', 'revealed', 'exposed']
-            features['clickbait_score'] = sum(1 for word in clickbait_words if word in text.lower())
-            
-            sensational_words = ['breaking', 'urgent', 'alert', 'warning', 'exclusive', 'leaked']
-            features['sensational_score'] = sum(1 for word in sensational_words if word in text.lower())
-            
-            return features
+        # Shared, memoized tokenization and character statistics
+        doc = preprocess(text)
         
         try:
             # Sentiment analysis
-            blob = TextBlob(text)
-            features['sentiment_polarity'] = blob.sentiment.polarity
-            features['sentiment_subjectivity'] = blob.sentiment.subjectivity
+            if SENTIMENT_BACKEND == 'textblob':
+                polarity, subjectivity = TextBlob(text).sentiment
+            else:
+                polarity, subjectivity = sentiment.score(text)
+            features['sentiment_polarity'] = polarity
+            features['sentiment_subjectivity'] = subjectivity
             
             # Text statistics
-            features['text_length'] = len(text)
-            features['word_count'] = len(text.split())
-            features['avg_word_length'] = np.mean([len(word) for word in text.split()] or [0])
+            features['text_length'] = doc.length
+            features['word_count'] = len(doc.words)
+            features['avg_word_length'] = sum(map(len, doc.words)) / len(doc.words) if doc.words else 0.0
             
             # Punctuation and capitalization patterns (fake news often has excessive punctuation/caps)
-            features['exclamation_count'] = text.count('!')
-            features['question_count'] = text.count('?')
-            features['caps_ratio'] = sum(1 for c in text if c.isupper()) / (len(text) or 1)
-            features['digit_ratio'] = sum(1 for c in text if c.isdigit()) / (len(text) or 1)
+            features['exclamation_count'] = doc.exclamation_count
+            features['question_count'] = doc.question_count
+            features['caps_ratio'] = doc.upper_count / (doc.length or 1)
+            features['digit_ratio'] = doc.digit_count / (doc.length or 1)
             
             # Clickbait indicators
-            clickbait_words = ['shocking', 'unbelievable', 'you wont believe', 'this one trick', 
-                             'doctors hate', 'secret', 'revealed', 'exposed']
-            features['clickbait_score'] = sum(1 for word in clickbait_words if word in text.lower())
+            features['clickbait_score'] = doc.contains_count(CLICKBAIT_WORDS)
             
             # Sensationalism indicators
-            sensational_words = ['breaking', 'urgent', 'alert', 'warning', 'exclusive', 'leaked']
-            features['sensational_score'] = sum(1 for word in sensational_words if word in text.lower())
+            features['sensational_score'] = doc.contains_count(SENSATIONAL_WORDS)
             
         except Exception as e:
             print(f"Error extracting linguistic features: {e}")
@@ -105,8 +140,8 @@ class AIFakeNewsDetector:
         """Combine TF-IDF and linguistic features"""
         features_list = []
         
-        # 1. TF-IDF features (traditional)
-        tfidf_features = self.vectorizer.transform([text]).toarray()[0]
+        # 1. TF-IDF features (traditional), from the shared token stream
+        tfidf_features = tfidf_transform(self.vectorizer, [preprocess(text)]).toarray()[0]
         features_list.append(tfidf_features)
         
         # 2. Linguistic features (pattern detection)
@@ -114,108 +149,42 @@ class AIFakeNewsDetector:
         ling_array = np.array(list(ling_features.values()))
         features_list.append(ling_array)
         
-        # Combine all features
-        combined = np.concatenate(features_list)
+        # Combine all features (float32: the forest scores in float32 anyway)
+        combined = np.concatenate(features_list).astype(np.float32)
         return combined.reshape(1, -1)
 
-    def train(self):
+    def distilled_features(self, text):
+        """Sparse TF-IDF row plus standardized linguistic features"""
+        tfidf = tfidf_transform(self.vectorizer, [preprocess(text)])
+        ling = np.array(list(self.extract_linguistic_features(text).values())).reshape(1, -1)
+        return sparse.hstack([tfidf, self.scaler.transform(ling)]).tocsr()
+
+    def train(self, feature_store=None, sample_size=500):
         """Train the AI model with enhanced features"""
-        try:
-            base_dir = os.path.dirname(__file__)
-            
-            # Try multiple paths to find the data files
-            possible_paths = [
-                (os.path.join(base_dir, 'data', 'fake.csv'), os.path.join(base_dir, 'data', 'true.csv')),
-                (os.path.join(base_dir, '..', 'backend', 'data', 'fake.csv'), os.path.join(base_dir, '..', 'backend', 'data', 'true.csv')),
-            ]
-            
-            fake_path = None
-            true_path = None
-            
-            for fp, tp in possible_paths:
-                if os.path.exists(fp) and os.path.exists(tp):
-                    fake_path = fp
-                    true_path = tp
-                    break
-            
-            # Load datasets
-            if not fake_path or not true_path:
-                print("⚠️ CSV files not found, using sample data")
-                fake_df = pd.DataFrame({
-                    'text': [
-                        "Aliens have landed on Earth according to secret NASA documents!",
-                        "You won't believe this one weird trick that doctors hate!",
-                        "The government is hiding a cure for cancer!",
-                        "Celebrities are secretly lizard people!",
-                        "5G towers are spreading the virus!",
-                        "BREAKING: Shocking revelation will change everything!",
-                        "This LEAKED document exposes the truth they don't want you to know!"
-                    ]
-                })
-                true_df = pd.DataFrame({
-                    'text': [
-                        "The government announced a new policy to support farmers.",
-                        "Scientists published research findings on climate change.",
-                        "The president met with world leaders to discuss the economy.",
-                        "Stock markets showed mixed results today.",
-                        "Congress passed a new infrastructure bill.",
-                        "Researchers at the university completed a five-year study.",
-                        "The company reported quarterly earnings that met expectations."
-                    ]
-                })
-            else:
-                print("📚 Loading real datasets from CSV files...")
-                fake_df = pd.read_csv(fake_path)
-                true_df = pd.read_csv(true_path)
-                
-                # Sample data for performance
-                fake_df = fake_df[['text']].sample(n=min(500, len(fake_df)), random_state=42)
-                true_df = true_df[['text']].sample(n=min(500, len(true_df)), random_state=42)
-                
-                print(f"✅ Loaded {len(fake_df)} fake news articles")
-                print(f"✅ Loaded {len(true_df)} true news articles")
-            
-            # Add labels
-            fake_df['label'] = 0  # Fake
-            true_df['label'] = 1  # Real
-            
-            # Combine and shuffle
-            df = pd.concat([fake_df, true_df], ignore_index=True)
-            df = df.sample(frac=1, random_state=42).reset_index(drop=True)
-            
-            print(f"📊 Total training samples: {len(df)}")
-            
-        except Exception as e:
-            print(f"❌ Error loading CSV files: {e}")
-            print("Using minimal fallback data")
-            df = pd.DataFrame({
-                'text': [
-                    "The government announced a new policy to support farmers.",
-                    "Aliens have landed on Earth according to secret NASA documents!",
-                    "Scientists discovered a cure for cancer after decades of research.",
-                    "You won't believe this shocking secret the government is hiding!",
-                ],
-                'label': [1, 0, 1, 0]
-            })
+        # Texts stay in one compact buffer; shuffling and splitting only
+        # move index arrays around
+        texts, labels = load_training_data(sample_size=sample_size)
+        print(f"📊 Total training samples: {len(texts)}")
 
         # Split data
-        X_train, X_test, y_train, y_test = train_test_split(
-            df['text'], df['label'], test_size=0.2, random_state=42
+        train_index, test_index = train_test_split(
+            np.arange(len(texts)), test_size=0.2, random_state=42
         )
+        X_train, X_test = texts.take(train_index), texts.take(test_index)
+        y_train, y_test = labels[train_index], labels[test_index]
+
+        # Each stage is reused from the feature store unless its inputs changed
+        store = feature_store or FeatureStore()
+        ling_config = {'version': LINGUISTIC_FEATURES_VERSION, 'sentiment': SENTIMENT_BACKEND}
 
         # Train TF-IDF vectorizer
         print("🔧 Training TF-IDF vectorizer...")
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
-        self.vectorizer.fit(X_train)
+        self.vectorizer, X_train_tfidf = store.fit_tfidf(X_train, TFIDF_PARAMS)
 
         # Extract combined features for all samples
         print("🧠 Extracting AI features...")
-        X_train_combined = []
-        for text in X_train:
-            combined = self.combine_features(text)
-            X_train_combined.append(combined[0])
-        
-        X_train_combined = np.array(X_train_combined)
+        X_train_ling = store.linguistic(X_train, self.extract_linguistic_features, ling_config)
+        X_train_combined = np.hstack([X_train_tfidf.toarray(), X_train_ling])
         
         print(f"📐 Feature dimension: {X_train_combined.shape[1]}")
 
@@ -232,14 +201,13 @@ class AIFakeNewsDetector:
         )
         
         self.model.fit(X_train_combined, y_train)
+        self.explainer = None
+        self.teacher_texts = {_fingerprint(text) for text in X_train}
 
         # Test accuracy
-        X_test_combined = []
-        for text in X_test:
-            combined = self.combine_features(text)
-            X_test_combined.append(combined[0])
-        
-        X_test_combined = np.array(X_test_combined)
+        X_test_tfidf = store.transform_tfidf(X_test, self.vectorizer)
+        X_test_ling = store.linguistic(X_test, self.extract_linguistic_features, ling_config)
+        X_test_combined = np.hstack([X_test_tfidf.toarray(), X_test_ling])
         predictions = self.model.predict(X_test_combined)
         accuracy = accuracy_score(y_test, predictions)
         
@@ -248,35 +216,187 @@ class AIFakeNewsDetector:
         # Save model and vectorizer
         joblib.dump(self.model, self.model_path)
         joblib.dump(self.vectorizer, self.vectorizer_path)
+        # Compact artifacts would otherwise keep serving the old weights
+        self.compact = compact.refresh(self.model, self.vectorizer, self.model_path, self.precision)
+
+        # Held-out distribution that live traffic is compared against
+        proba = self.model.predict_proba(X_test_combined)
+        save_baseline(self.baseline_path, build_baseline(
+            X_test, predictions, proba.max(axis=1), self.vectorizer.vocabulary_
+        ))
+        if self.monitor is not None:
+            self.monitor.reset(load_baseline(self.baseline_path), self.vectorizer.vocabulary_)
         print("💾 AI model trained and saved successfully!")
 
+    def distill(self, feature_store=None, sample_size=None, holdout=0.2, C=10.0):
+        """Fit a single sparse logistic model on the ensemble's soft labels.
+
+        The ensemble labels the whole corpus (sample_size=None uses every
+        article; the true labels are only used to report accuracy on the
+        held-out split). The holdout is drawn only from articles the ensemble
+        was not trained on, so both accuracies are out-of-sample. Saves the
+        distilled model and returns a report of agreement, accuracy and
+        per-article latency for both variants.
+        """
+        if self.variant != 'ensemble' or not self.model or not self.vectorizer or self.teacher_texts is None:
+            raise RuntimeError("Distillation needs a trained ensemble; call train() first")
+
+        store = feature_store or FeatureStore()
+        ling_config = {'version': LINGUISTIC_FEATURES_VERSION, 'sentiment': SENTIMENT_BACKEND}
+
+        texts, labels = load_training_data(sample_size=sample_size)
+        print(f"🧪 Distilling the ensemble on {len(texts)} articles...")
+
+        tfidf = store.transform_tfidf(texts, self.vectorizer)
+        ling = store.linguistic(texts, self.extract_linguistic_features, ling_config)
+
+        # Soft labels from the teacher, scored in batches to bound dense memory
+        soft = np.empty(len(texts))
+        for start in range(0, len(texts), DISTILL_BATCH_SIZE):
+            end = start + DISTILL_BATCH_SIZE
+            batch = np.hstack([tfidf[start:end].toarray(), ling[start:end]])
+            soft[start:end] = self.model.predict_proba(batch)[:, 1]
+
+        unseen = np.array([i for i, text in enumerate(texts) if _fingerprint(text) not in self.teacher_texts], dtype=np.int64)
+        if not len(unseen):
+            raise RuntimeError("Every article was in the ensemble's training split; nothing to hold out")
+        rng = np.random.RandomState(42)
+        test_index = np.sort(rng.choice(unseen, min(len(unseen), max(1, int(holdout * len(texts)))), replace=False))
+        train_index = np.setdiff1d(np.arange(len(texts)), test_index)
+
+        scaler = StandardScaler().fit(ling[train_index])
+        features = sparse.hstack([tfidf, scaler.transform(ling)]).tocsr()
+
+        # Soft-label logistic regression: every article appears once as FAKE
+        # and once as REAL, weighted by the teacher's probability of each
+        X = sparse.vstack([features[train_index], features[train_index]]).tocsr()
+        y = np.concatenate([np.zeros(len(train_index), dtype=int), np.ones(len(train_index), dtype=int)])
+        weights = np.concatenate([1 - soft[train_index], soft[train_index]])
+
+        student = LogisticRegression(C=C, max_iter=2000, random_state=42)
+        student.fit(X, y, sample_weight=weights)
+
+        teacher_pred = (soft[test_index] >= 0.5).astype(int)
+        student_pred = student.predict(features[test_index]).astype(int)
+
+        joblib.dump({'model': student, 'scaler': scaler}, self.distilled_path)
+        fresh = compact.refresh(student, self.vectorizer, self.distilled_path, self.precision, scaler=scaler)
+
+        distilled = AIFakeNewsDetector(variant='distilled', precision=self.precision)
+        distilled.distilled_path = self.distilled_path
+        distilled.vectorizer = self.vectorizer
+        distilled.model, distilled.scaler = student, scaler
+        distilled.compact = fresh
+
+        sample = [texts[i] for i in test_index[:200]]
+        report = {
+            'articles': len(texts),
+            'agreement': float(np.mean(teacher_pred == student_pred)),
+            'ensemble_accuracy': float(accuracy_score(labels[test_index], teacher_pred)),
+            'distilled_accuracy': float(accuracy_score(labels[test_index], student_pred)),
+            'ensemble_ms': _mean_latency_ms(self, sample),
+            'distilled_ms': _mean_latency_ms(distilled, sample),
+        }
+
+        print(f"🤝 Agreement with ensemble: {report['agreement']:.2%}")
+        print(f"✅ Accuracy: ensemble {report['ensemble_accuracy']:.2%}, "
+              f"distilled {report['distilled_accuracy']:.2%}")
+        print(f"⚡ Latency: ensemble {report['ensemble_ms']:.2f} ms, "
+              f"distilled {report['distilled_ms']:.2f} ms per article")
+        print(f"💾 Distilled model saved to {os.path.basename(self.distilled_path)}")
+        return report
+
+    def _served_model_path(self):
+        return self.distilled_path if self.variant == 'distilled' else self.model_path
+
+    def export_compact(self, precision='float32', texts=None, labels=None):
+        """Write the reduced-precision artifact and return its parity report"""
+        path = compact.artifact_path(self._served_model_path(), precision)
+        compact.export(self.model, self.vectorizer, path, precision, scaler=self.scaler)
+        if texts is None:
+            texts, labels = load_training_data()
+        ling = np.array([list(self.extract_linguistic_features(text).values()) for text in texts])
+        reference = (self.model, self.vectorizer, self.scaler) if self.scaler is not None else (self.model, self.vectorizer)
+        return compact.parity_report(reference, compact.load(path), texts, labels, ling)
+
     def load_model(self):
         """Load the trained AI model"""
+        self.explainer = None
+        if self.precision != 'float64':
+            # The compact artifact replaces the pickles when present
+            self.compact = compact.load(compact.artifact_path(self._served_model_path(), self.precision))
+            if self.compact is not None:
+                return
         try:
-            self.model = joblib.load(self.model_path)
             self.vectorizer = joblib.load(self.vectorizer_path)
-        except:
-            pass
+            if self.variant == 'distilled':
+                bundle = joblib.load(self.distilled_path)
+                self.model, self.scaler = bundle['model'], bundle['scaler']
+            else:
+                self.model = joblib.load(self.model_path)
+        except FileNotFoundError as e:
+            self.model = None
+            print(f"⚠️ {self.variant} AI model not found: {os.path.basename(e.filename or '')}. "
+                  f"Build it with `python train_model_ai.py`"
+                  + (" (the distilled model is written after training unless --no-distill is passed)" if self.variant == 'distilled' else ""))
+        except Exception as e:
+            self.model = None
+            print(f"⚠️ Could not load the {self.variant} AI model: {e}")
 
     def predict(self, text):
         """Predict with AI-enhanced features"""
-        if not self.model or not self.vectorizer:
+        if self.compact is None and (not self.model or not self.vectorizer):
             return None, 0.0
 
         try:
-            # Get combined features
-            features = self.combine_features(text)
-            
-            # Make prediction
-            prediction = self.model.predict(features)[0]
-            confidence = max(self.model.predict_proba(features)[0])
+            if self.compact is not None:
+                with stage('features'):
+                    ling = list(self.extract_linguistic_features(text).values())
+                    tfidf = self.compact.transform([preprocess(text)])
+                with stage('model'):
+                    prediction, confidence = self.compact.predict(tfidf, ling)
+            else:
+                # Get combined features
+                with stage('features'):
+                    if self.variant == 'distilled':
+                        features = self.distilled_features(text)
+                    else:
+                        features = self.combine_features(text)
+                
+                # Make prediction
+                with stage('model'):
+                    prediction = self.model.predict(features)[0]
+                    confidence = max(self.model.predict_proba(features)[0])
             
+            if self.monitor is not None:
+                with stage('monitor'):
+                    self.monitor.observe_prediction(text, prediction, confidence)
             return prediction, confidence
         except Exception as e:
             print(f"Error during prediction: {e}")
             return None, 0.0
 
-    def analyze_text(self, text):
+    def enable_monitoring(self):
+        """Feed every predict() into the process-wide drift monitor"""
+        vocabulary = self.compact.vocabulary if self.compact is not None else getattr(self.vectorizer, 'vocabulary_', None)
+        self.monitor = get_monitor(self.baseline_path, vocabulary)
+        return self.monitor
+
+    def explain(self, text, k=DEFAULT_TOP_K):
+        """Top-k terms and linguistic features behind the verdict on text"""
+        if self.explainer is None:
+            self.explainer = build_explainer(self.model, self.vectorizer, self.scaler, self.compact)
+        if self.explainer is None:
+            return None
+
+        doc = preprocess(text)
+        if self.compact is not None:
+            tfidf = self.compact.transform([doc])
+        else:
+            tfidf = tfidf_transform(self.vectorizer, [doc])
+        return self.explainer.explain(tfidf, self.extract_linguistic_features(text), k=k)
+
+    def analyze_text(self, text, explain=False):
         """Detailed analysis with explanations"""
         prediction, confidence = self.predict(text)
         
@@ -306,9 +426,38 @@ class AIFakeNewsDetector:
             reasons.append("Excessive capitalization")
         if features.get('exclamation_count', 0) > 3:
             reasons.append("Excessive exclamation marks")
-        if ADVANCED_FEATURES and abs(features.get('sentiment_polarity', 0)) > 0.5:
+        if abs(features.get('sentiment_polarity', 0)) > 0.5:
             reasons.append("Highly emotional tone")
         
         result['warning_signs'] = reasons
         
+        # Terms and features that actually drove the verdict
+        if explain:
+            result['explanation'] = self.explain(text)
+        
         return result
+
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector(variant=None, precision=None):
+    """Process-wide AIFakeNewsDetector per variant and precision"""
+    key = (variant or DEFAULT_VARIANT, precision or compact.DEFAULT_PRECISION)
+    with _detectors_lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            detector = _detectors[key] = AIFakeNewsDetector(*key)
+        return detector
+
+
+def _mean_latency_ms(detector, texts):
+    """Mean cold-cache predict() time per article, in milliseconds"""
+    if not texts:
+        return 0.0
+    preprocess.cache_clear()
+    start = time.perf_counter()
+    for text in texts:
+        detector.predict(text)
+    return (time.perf_counter() - start) / len(texts) * 1000
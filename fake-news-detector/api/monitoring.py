@@ -0,0 +1,291 @@
+# monitoring.py - Streaming drift and score-distribution monitoring for served models
+import bisect
+import json
+import math
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+from features import extract_ai_features
+from preprocess import preprocess
+
+# Population stability index above which a stream is flagged as drifted
+# (0.1 - 0.2 is usually read as moderate shift, above 0.2 as significant)
+PSI_THRESHOLD = float(os.environ.get('DRIFT_PSI_THRESHOLD', 0.2))
+# Requests observed before drift is reported at all
+MIN_DRIFT_SAMPLES = int(os.environ.get('DRIFT_MIN_SAMPLES', 100))
+
+CONFIDENCE_EDGES = [0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+# Histogram edges of streams the baseline has no quantiles for
+DEFAULT_EDGES = [0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 50, 100, 500, 1000, 5000]
+BASELINE_BINS = 10
+
+QUANTILES = (0.5, 0.9, 0.99)
+SKETCH_ACCURACY = 0.02
+SKETCH_MAX_BINS = 512
+
+CMS_WIDTH = 2048
+CMS_DEPTH = 4
+TOP_OOV_TOKENS = 20
+
+
+class QuantileSketch:
+    """Relative-error quantiles of non-negative values in bounded memory.
+
+    Values fall into log-spaced buckets (DDSketch): any quantile is returned
+    to within SKETCH_ACCURACY relative error. When more than max_bins buckets
+    are used, the lowest ones are merged.
+    """
+
+    def __init__(self, accuracy=SKETCH_ACCURACY, max_bins=SKETCH_MAX_BINS):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins = Counter()
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 1e-9:
+            self.zeros += 1
+            return
+        self.bins[math.ceil(math.log(value) / self.log_gamma)] += 1
+        if len(self.bins) > self.max_bins:
+            lowest = sorted(self.bins)[:2]
+            self.bins[lowest[1]] += self.bins.pop(lowest[0])
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class CountMinSketch:
+    """Approximate counts of a token stream in CMS_DEPTH x CMS_WIDTH counters.
+
+    Also keeps the few heaviest tokens seen so far, so the most common
+    unknown words can be listed without storing every token.
+    """
+
+    def __init__(self, width=CMS_WIDTH, depth=CMS_DEPTH, top=TOP_OOV_TOKENS, seed=0):
+        rng = np.random.RandomState(seed)
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        # Multiply-shift hashing of each token's 64-bit hash, one row per seed
+        self.multipliers = rng.randint(1, 2 ** 62, size=(depth, 1), dtype=np.int64) | 1
+        self.rows = np.arange(depth)[:, None]
+        self.top = top
+        self.heavy = {}
+        self.total = 0
+
+    def _columns(self, tokens):
+        hashes = np.fromiter((hash(t) for t in tokens), dtype=np.int64, count=len(tokens))
+        return ((hashes * self.multipliers) >> 20) % self.width
+
+    def update(self, counts):
+        """Add a {token: count} mapping"""
+        if not counts:
+            return
+        tokens = list(counts)
+        values = np.fromiter(counts.values(), dtype=np.int64, count=len(tokens))
+        columns = self._columns(tokens)
+        np.add.at(self.table, (np.broadcast_to(self.rows, columns.shape), columns), values)
+        self.total += int(values.sum())
+
+        estimates = self.table[self.rows, columns].min(axis=0)
+        floor = min(self.heavy.values()) if len(self.heavy) >= self.top else 0
+        for token, estimate in zip(tokens, estimates):
+            if estimate > floor or token in self.heavy:
+                self.heavy[token] = int(estimate)
+        if len(self.heavy) > self.top:
+            self.heavy = dict(Counter(self.heavy).most_common(self.top))
+
+    def most_common(self):
+        return sorted(self.heavy.items(), key=lambda item: -item[1])
+
+
+class Stream:
+    """Fixed-edge histogram plus quantile sketch of one monitored value"""
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.sketch = QuantileSketch()
+
+    def add(self, value):
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+        self.sketch.add(value)
+
+    def summary(self):
+        return {
+            'count': self.sketch.count,
+            'quantiles': {f"p{int(q * 100)}": self.sketch.quantile(q) for q in QUANTILES},
+            'edges': self.edges,
+            'histogram': self.counts,
+        }
+
+
+def psi(expected, actual):
+    """Population stability index between two histograms over the same bins"""
+    expected = np.asarray(expected, dtype=float) + 0.5
+    actual = np.asarray(actual, dtype=float) + 0.5
+    expected /= expected.sum()
+    actual /= actual.sum()
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class Monitor:
+    """Constant-memory view of live traffic, compared with a training baseline.
+
+    observe_prediction() records confidence, the predicted class and the
+    share of tokens outside the model's vocabulary (the tokens themselves go
+    into a count-min sketch); observe_features() records the linguistic
+    features. Streams that have a baseline use its decile edges, so the
+    population stability index can be computed straight from the counts.
+    """
+
+    def __init__(self, baseline=None, vocabulary=None):
+        self.lock = threading.Lock()
+        self.reset(baseline, vocabulary)
+
+    def reset(self, baseline=None, vocabulary=None):
+        """Start over against a new baseline, e.g. after retraining"""
+        # Swapped as a whole under the lock, so requests observed meanwhile
+        # land entirely in the old or the new state
+        oov_tokens = CountMinSketch()
+        with self.lock:
+            self.baseline = baseline
+            self.vocabulary = vocabulary
+            self.requests = 0
+            self.predictions = Counter()
+            self.streams = {}
+            self.oov_tokens = oov_tokens
+
+    def _stream(self, name):
+        stream = self.streams.get(name)
+        if stream is None:
+            reference = (self.baseline or {}).get('streams', {}).get(name)
+            default = CONFIDENCE_EDGES if name == 'confidence' else DEFAULT_EDGES
+            stream = self.streams[name] = Stream(reference['edges'] if reference else default)
+        return stream
+
+    def observe_prediction(self, text, prediction, confidence):
+        doc = preprocess(text)
+        unknown = {}
+        vocabulary = self.vocabulary
+        if vocabulary is not None:
+            unknown = {t: c for t, c in doc.token_counts.items() if t not in vocabulary}
+
+        with self.lock:
+            self.requests += 1
+            self.predictions[int(prediction)] += 1
+            self._stream('confidence').add(float(confidence))
+            # Skipped if reset() swapped the vocabulary since it was read
+            if vocabulary is not None and vocabulary is self.vocabulary:
+                self._stream('oov_rate').add(sum(unknown.values()) / (len(doc.tokens) or 1))
+                self.oov_tokens.update(unknown)
+
+    def observe_features(self, features):
+        with self.lock:
+            for name, value in features.items():
+                self._stream(name).add(float(value))
+
+    def drift(self):
+        """PSI of every stream against the baseline, flagged above PSI_THRESHOLD"""
+        if not self.baseline:
+            return {}
+        report = {}
+        for name, reference in self.baseline.get('streams', {}).items():
+            stream = self.streams.get(name)
+            if stream is None or stream.sketch.count < MIN_DRIFT_SAMPLES:
+                continue
+            value = psi(reference['histogram'], stream.counts)
+            report[name] = {'psi': round(value, 4), 'drifted': value > PSI_THRESHOLD}
+        return report
+
+    def report(self):
+        with self.lock:
+            drift = self.drift()
+            real = self.predictions.get(1, 0)
+            return {
+                'requests': self.requests,
+                'real_share': real / self.requests if self.requests else None,
+                'baseline_real_share': (self.baseline or {}).get('real_share'),
+                'streams': {name: stream.summary() for name, stream in self.streams.items()},
+                'top_oov_tokens': self.oov_tokens.most_common(),
+                'drift': drift,
+                'drifted': sorted(name for name, d in drift.items() if d['drifted']),
+                'psi_threshold': PSI_THRESHOLD,
+                'has_baseline': self.baseline is not None,
+            }
+
+
+def _baseline_stream(values):
+    """Decile edges of the training values and the training counts per bin"""
+    values = np.asarray(values, dtype=float)
+    edges = np.unique(np.quantile(values, np.linspace(0, 1, BASELINE_BINS + 1)[1:-1])).tolist()
+    stream = Stream(edges)
+    for value in values:
+        stream.add(value)
+    return {'edges': edges, 'histogram': stream.counts}
+
+
+def build_baseline(texts, predictions, confidences, vocabulary, feature_fn=None):
+    """Snapshot of the training distribution, in the shape Monitor expects.
+
+    feature_fn defaults to features.extract_ai_features, which is what
+    analyze_with_ai feeds to observe_features().
+    """
+    feature_fn = feature_fn or extract_ai_features
+
+    texts = list(texts)
+    columns = {'confidence': list(confidences), 'oov_rate': []}
+    for text in texts:
+        tokens = preprocess(text).tokens
+        columns['oov_rate'].append(sum(t not in vocabulary for t in tokens) / (len(tokens) or 1))
+        for name, value in feature_fn(text).items():
+            columns.setdefault(name, []).append(float(value))
+
+    return {
+        'articles': len(texts),
+        'real_share': float(np.mean(np.asarray(predictions) == 1)) if len(texts) else None,
+        'streams': {name: _baseline_stream(values) for name, values in columns.items() if values},
+    }
+
+
+def save_baseline(path, baseline):
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=1)
+
+
+def load_baseline(path):
+    """Baseline snapshot at path, or None if there is none"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+_monitors = {}
+_monitors_lock = threading.Lock()
+
+
+def get_monitor(baseline_path, vocabulary=None):
+    """Process-wide Monitor per baseline file, shared by every endpoint"""
+    with _monitors_lock:
+        monitor = _monitors.get(baseline_path)
+        if monitor is None:
+            monitor = _monitors[baseline_path] = Monitor(load_baseline(baseline_path), vocabulary)
+        return monitor
@@ -0,0 +1,188 @@
+# preprocess.py - Shared single-pass text preprocessing for every feature consumer
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+# Same pattern TfidfVectorizer uses by default, so tokens are interchangeable
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+(?:[.!?]+|\n|$)")
+
+UPPERCASE_BYTES = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+DIGIT_BYTES = b"0123456789"
+
+# Recently seen documents kept in memory: at most PREPROCESS_CACHE_SIZE of
+# them, taking about PREPROCESS_CACHE_BYTES in total. A Document takes ~20x
+# its text's size, so texts over PREPROCESS_CACHE_MAX_CHARS are never kept
+PREPROCESS_CACHE_SIZE = int(os.environ.get('PREPROCESS_CACHE_SIZE', 1024))
+PREPROCESS_CACHE_BYTES = int(os.environ.get('PREPROCESS_CACHE_BYTES', 64 * 1024 * 1024))
+PREPROCESS_CACHE_MAX_CHARS = int(os.environ.get('PREPROCESS_CACHE_MAX_CHARS', 64 * 1024))
+
+
+class Document:
+    """Everything the detectors need from one text, computed once"""
+
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        self.words = text.split()
+        self.tokens = TOKEN_PATTERN.findall(self.lower)
+        self.length = len(text)
+        self.exclamation_count = text.count('!')
+        self.question_count = text.count('?')
+
+        if text.isascii():
+            # Compiled path: count bytes in C instead of looping over characters
+            raw = text.encode('ascii')
+            self.upper_count = len(raw) - len(raw.translate(None, UPPERCASE_BYTES))
+            self.digit_count = len(raw) - len(raw.translate(None, DIGIT_BYTES))
+        else:
+            self.upper_count = sum(map(str.isupper, text))
+            self.digit_count = sum(map(str.isdigit, text))
+
+        self._sentences = None
+        self._token_counts = None
+
+    @property
+    def token_counts(self):
+        """Counter of tokens, shared by TF-IDF and lexicon lookups"""
+        if self._token_counts is None:
+            self._token_counts = Counter(self.tokens)
+        return self._token_counts
+
+    @property
+    def sentences(self):
+        """(start, end) character spans of each sentence"""
+        if self._sentences is None:
+            self._sentences = [
+                m.span() for m in SENTENCE_PATTERN.finditer(self.text) if m.group().strip()
+            ]
+        return self._sentences
+
+    def contains_count(self, phrases):
+        """How many of the phrases occur in the lowercased text"""
+        return sum(1 for phrase in phrases if phrase in self.lower)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held: the text, its lowercased copy, and ~70
+        bytes per word and token string (list slot, object header, counts)"""
+        return 2 * self.length + 72 * (len(self.words) + len(self.tokens))
+
+
+class DocumentCache:
+    """LRU cache of Documents bounded by entry count and by approximate bytes"""
+
+    def __init__(self, max_items=PREPROCESS_CACHE_SIZE, max_bytes=PREPROCESS_CACHE_BYTES,
+                 max_chars=PREPROCESS_CACHE_MAX_CHARS):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        with self._lock:
+            doc = self._docs.get(text)
+            if doc is not None:
+                self._docs.move_to_end(text)
+                self.hits += 1
+                return doc
+            self.misses += 1
+
+        doc = Document(text)
+        if len(text) > self.max_chars:
+            return doc
+        size = doc.nbytes
+        with self._lock:
+            if text not in self._docs:
+                self._docs[text] = doc
+                self.nbytes += size
+                while self._docs and (len(self._docs) > self.max_items or self.nbytes > self.max_bytes):
+                    _, evicted = self._docs.popitem(last=False)
+                    self.nbytes -= evicted.nbytes
+        return doc
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self.nbytes = 0
+
+    def info(self):
+        return {'documents': len(self._docs), 'bytes': self.nbytes,
+                'hits': self.hits, 'misses': self.misses}
+
+
+_cache = DocumentCache()
+
+
+def preprocess(text):
+    """Memoized Document for text; repeat requests skip preprocessing"""
+    return _cache.get(text)
+
+
+# functools.lru_cache-style helpers, e.g. for cold-cache benchmarks
+preprocess.cache_clear = _cache.clear
+preprocess.cache_info = _cache.info
+
+
+def _uses_default_analyzer(vectorizer):
+    params = vectorizer.get_params()
+    return (
+        params['analyzer'] == 'word'
+        and params['lowercase']
+        and params['token_pattern'] == TOKEN_PATTERN.pattern
+        and params['tokenizer'] is None
+        and params['preprocessor'] is None
+        and params['strip_accents'] is None
+        and tuple(params['ngram_range']) == (1, 1)
+    )
+
+
+def tfidf_transform(vectorizer, docs):
+    """TF-IDF matrix for Documents, reusing their tokens.
+
+    Matches vectorizer.transform on the raw texts. Stop words need no
+    filtering: they never make it into a fitted vocabulary. Vectorizers
+    with a non-default analyzer fall back to vectorizer.transform.
+    """
+    if not _uses_default_analyzer(vectorizer):
+        return vectorizer.transform([doc.text for doc in docs])
+
+    vocabulary = vectorizer.vocabulary_
+    dtype = vectorizer.dtype
+    indptr = [0]
+    indices = []
+    values = []
+    for doc in docs:
+        # Look up each distinct token once rather than every occurrence
+        for token, count in doc.token_counts.items():
+            index = vocabulary.get(token)
+            if index is not None:
+                indices.append(index)
+                values.append(count)
+        indptr.append(len(indices))
+
+    indices = np.array(indices, dtype=np.int32)
+    data = np.array(values, dtype=dtype)
+
+    if vectorizer.binary:
+        data[:] = 1
+    if vectorizer.sublinear_tf:
+        np.log(data, data)
+        data += 1
+    if vectorizer.use_idf:
+        data *= vectorizer.idf_[indices]
+
+    matrix = sparse.csr_matrix((data, indices, np.array(indptr)), shape=(len(docs), len(vocabulary)))
+    matrix.sort_indices()
+    if vectorizer.norm:
+        matrix = normalize(matrix, norm=vectorizer.norm, copy=False)
+    return matrix
@@ -0,0 +1,247 @@
+# profiling.py - On-demand profiles of individual serving requests
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+# Request header that turns profiling on: "stages" (wall-clock stage tracer)
+# or "cprofile" (full function profile); any other non-empty value means stages
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+# Profiles can only be requested and read with this X-Admin-Token; without
+# it only server-side sampling (PROFILE_SAMPLE_RATE) is on
+ADMIN_TOKEN = os.environ.get('PROFILE_ADMIN_TOKEN')
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+# Fraction of requests traced without being asked (stage tracer only)
+SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR',
+    os.path.join(os.path.dirname(__file__), '.profiles')
+)
+# Profiles kept on disk; the oldest are removed first
+MAX_PROFILES = int(os.environ.get('PROFILE_KEEP', 200))
+TOP_FUNCTIONS = 25
+
+MODES = ('stages', 'cprofile')
+
+_local = threading.local()
+# Only one cProfile can be active per interpreter; others fall back to stages
+_cprofile_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a named stage of the request being profiled, if any"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.append({
+            'stage': name,
+            'start_ms': round((start - _local.start) * 1000, 3),
+            'ms': round((time.perf_counter() - start) * 1000, 3),
+        })
+
+
+def authorized(headers):
+    """Whether the request carries the admin token (never, if none is configured)"""
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(headers.get(ADMIN_TOKEN_HEADER) or '', ADMIN_TOKEN)
+
+
+def requested_mode(headers):
+    """Profiling mode for a request: from the header, else by sampling, else None"""
+    value = (headers.get(PROFILE_HEADER) or '').strip().lower()
+    if value and value not in ('0', 'false', 'off') and authorized(headers):
+        return value if value in MODES else 'stages'
+    if SAMPLE_RATE and random.random() < SAMPLE_RATE:
+        return 'stages'
+    return None
+
+
+def model_version(detector):
+    """Short identifier of the artifacts a detector serves, changes on retrain"""
+    parts = [type(detector).__name__, getattr(detector, 'variant', ''), getattr(detector, 'precision', '')]
+    for attr in ('model_path', 'vectorizer_path'):
+        path = getattr(detector, attr, None)
+        try:
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        except (TypeError, OSError):
+            continue
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest()[:12]
+
+
+@contextmanager
+def profile(endpoint, mode, text='', version=None):
+    """Profile the enclosed block and save it; yields the record (None if off)"""
+    if mode is None:
+        yield None
+        return
+
+    profiler = None
+    locked = mode == 'cprofile' and _cprofile_lock.acquire(blocking=False)
+    if locked:
+        profiler = cProfile.Profile()
+    elif mode == 'cprofile':
+        mode = 'stages'
+
+    record = {
+        'id': f"{int(time.time() * 1000)}-{endpoint}-{uuid.uuid4().hex[:8]}",
+        'endpoint': endpoint,
+        'mode': mode,
+        'timestamp': time.time(),
+        'input_chars': len(text),
+        'input_bytes': len(text.encode('utf-8', 'replace')),
+        'input_words': len(text.split()),
+        'model_version': version,
+    }
+    _local.trace = []
+    _local.start = time.perf_counter()
+    try:
+        if profiler is not None:
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler or debugger owns the interpreter's hooks
+                profiler = None
+                record['mode'] = 'stages'
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            record['wall_ms'] = round((time.perf_counter() - _local.start) * 1000, 3)
+            record['stages'] = _local.trace
+            _local.trace = None
+            save(record, profiler)
+    finally:
+        if locked:
+            _cprofile_lock.release()
+
+
+def save(record, profiler=None, directory=None):
+    """Write a profile record (and the raw cProfile stats) to the profile directory"""
+    directory = directory or PROFILE_DIR
+    try:
+        os.makedirs(directory, exist_ok=True)
+        if profiler is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(profiler, stream=stream)
+            stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+            record['top_functions'] = stream.getvalue()
+            stats.dump_stats(os.path.join(directory, f"{record['id']}.prof"))
+            record['pstats_file'] = f"{record['id']}.prof"
+        with open(os.path.join(directory, f"{record['id']}.json"), 'w') as f:
+            json.dump(record, f, indent=1)
+        _prune(directory)
+    except OSError as e:
+        print(f"Could not save profile {record['id']}: {e}")
+
+
+def _prune(directory):
+    records = sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    for name in records[:max(0, len(records) - MAX_PROFILES)]:
+        for path in (name, name[:-5] + '.prof'):
+            try:
+                os.remove(os.path.join(directory, path))
+            except OSError:
+                pass
+
+
+def load(profile_id, directory=None):
+    """One saved profile, or None"""
+    directory = directory or PROFILE_DIR
+    if os.path.basename(profile_id) != profile_id:
+        return None
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def slowest(limit=10, endpoint=None, directory=None):
+    """The slowest saved profiles, slowest first"""
+    directory = directory or PROFILE_DIR
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.json')]
+    except OSError:
+        return []
+    records = [load(name[:-5], directory) for name in names]
+    records = [r for r in records if r and (endpoint is None or r['endpoint'] == endpoint)]
+    return sorted(records, key=lambda r: -r['wall_ms'])[:limit]
+
+
+def admin_response(headers, query):
+    """(status, body) for the profile listing of a BaseHTTPRequestHandler.
+
+    query is a parse_qs() dict: ?profiles[&limit=N] lists the slowest saved
+    profiles, ?profile=<id> returns one.
+    """
+    if not authorized(headers):
+        return 403, {'error': 'Forbidden'}
+    if 'profile' in query:
+        record = load(query['profile'][0])
+        return (200, record) if record else (404, {'error': 'Profile not found'})
+    try:
+        limit = int(query.get('limit', ['10'])[0])
+    except ValueError:
+        limit = 10
+    return 200, {'profiles': slowest(limit, query.get('endpoint', [None])[0])}
+
+
+def profiled(endpoint, detector):
+    """Flask view decorator: profile the request when asked to or sampled"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import make_response, request
+
+            mode = requested_mode(request.headers)
+            if mode is None:
+                return view(*args, **kwargs)
+            data = request.get_json(silent=True)
+            text = data.get('text') if isinstance(data, dict) else None
+            with profile(endpoint, mode, text if isinstance(text, str) else '', model_version(detector)) as record:
+                response = make_response(view(*args, **kwargs))
+            response.headers[PROFILE_ID_HEADER] = record['id']
+            return response
+        return wrapper
+    return decorator
+
+
+def install(app):
+    """GET /admin/profiles (slowest first) and /admin/profiles/<id> for a Flask app"""
+    from flask import jsonify, request
+
+    @app.route('/admin/profiles', methods=['GET'])
+    def list_profiles():
+        if not authorized(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+        limit = request.args.get('limit', 10, type=int)
+        return jsonify({'profiles': slowest(limit, request.args.get('endpoint'))})
+
+    @app.route('/admin/profiles/<profile_id>', methods=['GET'])
+    def get_profile(profile_id):
+        if not authorized(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+        record = load(profile_id)
+        if record is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        return jsonify(record)
@@ -0,0 +1,245 @@
+# retrieval.py - Inverted index of the labeled corpus for related-article evidence
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from dataset import TextColumn
+from preprocess import preprocess, tfidf_transform
+
+DEFAULT_INDEX_DIR = os.environ.get(
+    'RETRIEVAL_INDEX_DIR',
+    os.path.join(os.path.dirname(__file__), '.retrieval_index')
+)
+
+# Wider vocabulary than the classifiers: rare names and places are what make
+# two articles about the same story similar
+RETRIEVAL_TFIDF_PARAMS = {'stop_words': 'english', 'max_features': 50000, 'sublinear_tf': True}
+
+# Documents per segment. Each segment keeps per-term maximum weights, so
+# segments that cannot reach the current top-k are skipped without scoring
+SEGMENT_DOCS = 8192
+
+SNIPPET_CHARS = 280
+DEFAULT_K = int(os.environ.get('RETRIEVAL_TOP_K', 5))
+
+LABEL_NAMES = {0: 'FAKE', 1: 'REAL'}
+
+MANIFEST = 'manifest.json'
+VECTORIZER_FILE = 'vectorizer.joblib'
+FIELDS = ('title', 'snippet', 'subject', 'date')
+
+
+def content_hashes(texts):
+    """64-bit content hash per document, used to skip already-indexed articles"""
+    return np.array(
+        [int.from_bytes(hashlib.sha1(text.encode('utf-8')).digest()[:8], 'little') for text in texts],
+        dtype=np.uint64,
+    )
+
+
+class Segment:
+    """Immutable slice of the index, memory-mapped from .npy files.
+
+    Postings are stored term-major as a CSR matrix (terms x documents):
+    offsets[t]:offsets[t + 1] are the documents containing term t and their
+    L2-normalized TF-IDF weights.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        def load(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+
+        self.offsets = load('offsets')
+        self.docs = load('docs')
+        self.weights = load('weights')
+        self.max_weight = load('max_weight')
+        self.labels = load('labels')
+        self.hashes = load('hashes')
+        self.fields = {
+            name: TextColumn(load(f"{name}_data"), load(f"{name}_offsets")) for name in FIELDS
+        }
+        self.postings = sparse.csr_matrix(
+            (self.weights, self.docs, self.offsets),
+            shape=(len(self.max_weight), len(self.labels)), copy=False,
+        )
+
+    def __len__(self):
+        return len(self.labels)
+
+    @classmethod
+    def write(cls, path, matrix, labels, fields):
+        """Write documents (rows of an L2-normalized TF-IDF matrix) as a segment"""
+        os.makedirs(path, exist_ok=True)
+        postings = sparse.csr_matrix(matrix.T, dtype=np.float32)
+        postings.sort_indices()
+        # scipy wants matching index dtypes; int32 is enough below 2**31 postings
+        index_dtype = np.int32 if postings.nnz < 2 ** 31 else np.int64
+
+        max_weight = np.zeros(postings.shape[0], dtype=np.float32)
+        if postings.nnz:
+            max_weight = postings.max(axis=1).toarray().ravel().astype(np.float32)
+
+        arrays = {
+            'offsets': postings.indptr.astype(index_dtype),
+            'docs': postings.indices.astype(index_dtype),
+            'weights': postings.data,
+            'max_weight': max_weight,
+            'labels': np.asarray(labels, dtype=np.int8),
+            'hashes': content_hashes(fields['text']),
+        }
+        for name in FIELDS:
+            column = TextColumn.from_strings(fields[name])
+            arrays[f"{name}_data"] = column._data
+            arrays[f"{name}_offsets"] = column._offsets
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array)
+        return cls(path)
+
+    def upper_bound(self, terms, weights):
+        """Highest cosine score any document in this segment can reach"""
+        return float(np.dot(weights, self.max_weight[terms]))
+
+    def scores(self, queries):
+        """Dense (queries x documents) cosine scores: one sparse product"""
+        return (queries @ self.postings).toarray()
+
+    def document(self, i, score):
+        return {
+            'title': self.fields['title'][i],
+            'snippet': self.fields['snippet'][i],
+            'subject': self.fields['subject'][i],
+            'date': self.fields['date'][i],
+            'label': LABEL_NAMES.get(int(self.labels[i]), str(self.labels[i])),
+            'score': round(float(score), 4),
+        }
+
+
+class RetrievalIndex:
+    """Segmented inverted index with top-k cosine search.
+
+    build() fits the vectorizer and writes the corpus as segments; add()
+    appends new labeled articles as extra segments with the same vocabulary
+    (already-indexed articles are skipped), so growing the corpus never
+    rewrites existing files. Segments are memory-mapped on open.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_INDEX_DIR
+        with open(os.path.join(self.path, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.vectorizer = joblib.load(os.path.join(self.path, VECTORIZER_FILE))
+        self.segments = [Segment(os.path.join(self.path, name)) for name in self.manifest['segments']]
+
+    def __len__(self):
+        return sum(len(segment) for segment in self.segments)
+
+    @classmethod
+    def build(cls, texts, labels, path=None, titles=None, subjects=None, dates=None, params=None):
+        """Fit the vectorizer on texts and write a fresh index to path"""
+        path = path or DEFAULT_INDEX_DIR
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            shutil.rmtree(path)
+        os.makedirs(path, exist_ok=True)
+        vectorizer = TfidfVectorizer(**(params or RETRIEVAL_TFIDF_PARAMS))
+        vectorizer.fit(texts)
+        joblib.dump(vectorizer, os.path.join(path, VECTORIZER_FILE))
+        cls._write_manifest(path, {'segments': [], 'params': vectorizer.get_params()})
+
+        index = cls(path)
+        index.add(texts, labels, titles, subjects, dates)
+        return index
+
+    @staticmethod
+    def _write_manifest(path, manifest):
+        # Replace atomically so a reader never sees a half-written manifest
+        tmp = os.path.join(path, MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp, os.path.join(path, MANIFEST))
+
+    def add(self, texts, labels, titles=None, subjects=None, dates=None):
+        """Index new labeled articles; returns how many were actually new"""
+        texts = list(texts)
+        labels = np.asarray(labels)
+        columns = {
+            'title': list(titles) if titles is not None else [text[:80] for text in texts],
+            'subject': list(subjects) if subjects is not None else [''] * len(texts),
+            'date': list(dates) if dates is not None else [''] * len(texts),
+        }
+
+        hashes = content_hashes(texts)
+        known = np.concatenate([s.hashes for s in self.segments]) if self.segments else np.zeros(0, np.uint64)
+        # Skip articles already in the index, and repeats within the batch
+        _, first = np.unique(hashes, return_index=True)
+        keep = np.zeros(len(texts), dtype=bool)
+        keep[first] = True
+        rows = np.flatnonzero(keep & ~np.isin(hashes, known))
+
+        for start in range(0, len(rows), SEGMENT_DOCS):
+            chunk = rows[start:start + SEGMENT_DOCS]
+            chunk_texts = [texts[i] for i in chunk]
+            fields = {name: [columns[name][i] for i in chunk] for name in ('title', 'subject', 'date')}
+            fields['text'] = chunk_texts
+            fields['snippet'] = [' '.join(text[:SNIPPET_CHARS].split()) for text in chunk_texts]
+            matrix = tfidf_transform(self.vectorizer, [preprocess(text) for text in chunk_texts])
+
+            name = f"segment-{len(self.manifest['segments']):05d}"
+            self.segments.append(Segment.write(os.path.join(self.path, name), matrix, labels[chunk], fields))
+            self.manifest['segments'].append(name)
+            self._write_manifest(self.path, self.manifest)
+
+        return len(rows)
+
+    def search_batch(self, texts, k=DEFAULT_K):
+        """Top-k labeled articles for each text, best first.
+
+        Segments are visited in order of their score upper bound, and a
+        query is only scored against a segment when that bound beats the
+        k-th best score it has found so far, so with a single query every
+        segment after the first unreachable one is skipped.
+        """
+        queries = tfidf_transform(self.vectorizer, [preprocess(text) for text in texts]).astype(np.float32)
+        results = [[] for _ in texts]
+
+        bounds = np.array([
+            [segment.upper_bound(queries[q].indices, queries[q].data) for segment in self.segments]
+            for q in range(len(texts))
+        ]).reshape(len(texts), len(self.segments))
+
+        for s in np.argsort(-bounds.max(axis=0)) if len(texts) else []:
+            segment = self.segments[s]
+            # Queries that could still gain from this segment
+            pending = [q for q in range(len(texts)) if bounds[q, s] > 0 and
+                       (len(results[q]) < k or results[q][-1][0] < bounds[q, s])]
+            if not pending:
+                continue
+            scores = segment.scores(queries[pending])
+            for row, q in enumerate(pending):
+                top = np.argpartition(-scores[row], min(k, len(segment)) - 1)[:k]
+                candidates = [(scores[row, i], s, i) for i in top if scores[row, i] > 0]
+                results[q] = sorted(results[q] + candidates, key=lambda c: -c[0])[:k]
+
+        return [[self.segments[s].document(i, score) for score, s, i in found] for found in results]
+
+    def search(self, text, k=DEFAULT_K):
+        return self.search_batch([text], k)[0]
+
+
+def open_index(path=None):
+    """RetrievalIndex at path, or None if no index has been built there"""
+    path = path or DEFAULT_INDEX_DIR
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return None
+    try:
+        return RetrievalIndex(path)
+    except Exception as e:
+        print(f"Could not open retrieval index: {e}")
+        return None
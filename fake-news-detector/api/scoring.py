@@ -0,0 +1,349 @@
+# scoring.py - Several models scored from one shared tokenization and TF-IDF pass
+import hashlib
+import os
+import threading
+
+import numpy as np
+from scipy import sparse
+
+from preprocess import _uses_default_analyzer, preprocess, tfidf_transform
+from profiling import stage
+
+# primary decides the verdict; a candidate decides it for its share of
+# traffic (A/B) and is otherwise scored like a shadow; compare scores are
+# returned next to the verdict; shadow scores are only recorded in metrics()
+ROLES = ('primary', 'candidate', 'compare', 'shadow')
+
+# Models served by default, as name:role[:traffic] entries (see MODEL_FACTORIES).
+# e.g. SCORING_MODELS="basic:primary,ai:candidate:0.1,ai_distilled:shadow"
+DEFAULT_SPEC = os.environ.get('SCORING_MODELS', 'basic:primary,ai:compare')
+
+
+def _basic():
+    from model import get_detector
+    return get_detector()
+
+
+def _ai(variant):
+    def factory():
+        from model_ai import get_detector
+        return get_detector(variant)
+    return factory
+
+
+MODEL_FACTORIES = {
+    'basic': _basic,
+    'ai': _ai('ensemble'),
+    'ai_distilled': _ai('distilled'),
+}
+
+
+class TfidfSpace:
+    """One TF-IDF feature space; models whose vectorizers match share it.
+
+    The key covers the vocabulary, idf weights and transform flags, so the
+    pickled vectorizer and a compact artifact exported from it (or the
+    basic and AI vectorizers, which are fit on the same data) get the same
+    key and the text is only vectorized once.
+    """
+
+    def __init__(self, transform, terms, idf, flags, exact=True):
+        self.transform = transform
+        digest = hashlib.sha1('\n'.join(terms).encode('utf-8'))
+        digest.update(np.asarray(idf, dtype=np.float32).tobytes())
+        digest.update(repr(flags).encode())
+        # Vectorizers with a custom analyzer never share a pass
+        self.key = digest.hexdigest() if exact else f"{digest.hexdigest()}:{id(transform)}"
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        flags = (vectorizer.binary, vectorizer.sublinear_tf, vectorizer.norm)
+        idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(terms))
+        return cls(lambda docs: tfidf_transform(vectorizer, docs), terms, idf, flags,
+                   exact=_uses_default_analyzer(vectorizer))
+
+    @classmethod
+    def from_compact(cls, model):
+        terms = sorted(model.vocabulary, key=model.vocabulary.get)
+        return cls(model.transform, terms, model.idf, (model.binary, model.sublinear_tf, model.norm))
+
+
+class Artifacts:
+    """The model, vectorizer, scaler and compact artifact a detector served at one moment"""
+
+    def __init__(self, detector):
+        self.compact = getattr(detector, 'compact', None)
+        self.model = getattr(detector, 'model', None)
+        self.vectorizer = getattr(detector, 'vectorizer', None)
+        self.scaler = getattr(detector, 'scaler', None)
+        if self.compact is not None:
+            self.space = TfidfSpace.from_compact(self.compact)
+            self.classes = list(self.compact.classes)
+        elif self.model is not None and self.vectorizer is not None:
+            self.space = TfidfSpace.from_vectorizer(self.vectorizer)
+            self.classes = list(self.model.classes_)
+        else:
+            self.space = None
+
+    def same(self, detector):
+        return (getattr(detector, 'compact', None) is self.compact
+                and getattr(detector, 'model', None) is self.model
+                and getattr(detector, 'vectorizer', None) is self.vectorizer
+                and getattr(detector, 'scaler', None) is self.scaler)
+
+
+class ScoredModel:
+    """A detector's model as a function of shared features: P(REAL) per row"""
+
+    def __init__(self, name, detector, role='compare', traffic=0.0):
+        if role not in ROLES:
+            raise ValueError(f"Unknown role {role!r}, expected one of {ROLES}")
+        self.name = name
+        self.detector = detector
+        self.role = role
+        self.traffic = float(traffic)
+        self.variant = getattr(detector, 'variant', None)
+        # The AI detectors append linguistic features to the TF-IDF row
+        self.needs_ling = hasattr(detector, 'extract_linguistic_features')
+        self.artifacts = None
+        self.refresh()
+
+    def refresh(self):
+        """Artifacts the detector serves now, rebuilt after it is retrained or reloaded.
+
+        Each request scores against one snapshot, so the vocabulary and the
+        classifier always come from the same training run.
+        """
+        artifacts = self.artifacts
+        if artifacts is None or not artifacts.same(self.detector):
+            artifacts = Artifacts(self.detector)
+            if artifacts.space is None:
+                raise ValueError(f"Model {self.name!r} is not loaded")
+            self.artifacts = artifacts
+        return artifacts
+
+    @property
+    def space(self):
+        return self.artifacts.space
+
+    def proba(self, tfidf, ling, artifacts=None):
+        """Probability of class 1 (REAL) for each row"""
+        artifacts = artifacts or self.artifacts
+        if artifacts.compact is not None:
+            p = artifacts.compact.predict_proba(tfidf, ling if self.needs_ling else None)
+            return p if artifacts.classes[1] == 1 else 1.0 - p
+
+        if not self.needs_ling:
+            features = tfidf
+        elif self.variant == 'distilled':
+            features = sparse.hstack([tfidf, artifacts.scaler.transform(ling)]).tocsr()
+        else:
+            features = np.hstack([tfidf.toarray(), ling]).astype(np.float32)
+        return artifacts.model.predict_proba(features)[:, artifacts.classes.index(1)]
+
+
+class MultiScorer:
+    """Scores every registered model from one feature pass per request or batch.
+
+    Texts are tokenized once, vectorized once per distinct TF-IDF space and
+    the linguistic features computed once, then the shared matrices fan out
+    to each model. The primary model (or, for its share of traffic, an A/B
+    candidate) gives the verdict; the other models' scores are returned or
+    recorded against it for comparison.
+    """
+
+    def __init__(self, models=()):
+        self.models = []
+        self.lock = threading.Lock()
+        self.stats = {}
+        for model in models:
+            self.add(model)
+
+    def register(self, name, detector, role='compare', traffic=0.0):
+        return self.add(ScoredModel(name, detector, role, traffic))
+
+    def add(self, model):
+        with self.lock:
+            if any(m.name == model.name for m in self.models):
+                raise ValueError(f"Model {model.name!r} is already registered")
+            if model.role == 'primary' and self.primary is not None:
+                raise ValueError(f"{self.primary.name!r} is already the primary model")
+            if model.role == 'candidate' and sum(m.traffic for m in self.candidates) + model.traffic > 1:
+                raise ValueError("Candidate traffic adds up to more than 1")
+            self.models.append(model)
+            self.stats[model.name] = {'scored': 0, 'served': 0, 'agreements': 0, 'abs_diff_total': 0.0}
+        return model
+
+    def unregister(self, name):
+        with self.lock:
+            self.models = [m for m in self.models if m.name != name]
+            self.stats.pop(name, None)
+
+    def get(self, name):
+        return next((m for m in self.models if m.name == name), None)
+
+    @property
+    def primary(self):
+        return next((m for m in self.models if m.role == 'primary'), None)
+
+    @property
+    def candidates(self):
+        return [m for m in self.models if m.role == 'candidate']
+
+    @property
+    def spaces(self):
+        """Distinct TF-IDF passes per request"""
+        return len({m.space.key for m in self.models})
+
+    def arm(self, key):
+        """Model that serves this request: a candidate for its traffic share, else primary.
+
+        Assignment is a hash of key (e.g. a client id, or the text), so a
+        given key always sees the same model.
+        """
+        bucket = int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'little') / 2 ** 64
+        edge = 0.0
+        for model in self.candidates:
+            edge += model.traffic
+            if bucket < edge:
+                return model
+        return self.primary
+
+    def features(self, texts, models=None, artifacts=None):
+        """(tfidf matrix per space key, linguistic feature matrix or None)"""
+        models = self.models if models is None else models
+        artifacts = artifacts or {model.name: model.refresh() for model in models}
+        docs = [preprocess(text) for text in texts]
+        tfidf = {}
+        for model in models:
+            space = artifacts[model.name].space
+            if space.key not in tfidf:
+                tfidf[space.key] = space.transform(docs)
+        ling = None
+        if any(m.needs_ling for m in models):
+            extract = next(m for m in models if m.needs_ling).detector.extract_linguistic_features
+            ling = np.array([list(extract(text).values()) for text in texts], dtype=np.float32)
+        return tfidf, ling
+
+    def score_batch(self, texts, keys=None, include_shadow=False):
+        """Verdict plus every model's score for each text"""
+        texts = list(texts)
+        models = list(self.models)
+        if self.primary is None or not texts:
+            return [None] * len(texts)
+
+        # Models retrained since the last request are picked up here
+        artifacts = {model.name: model.refresh() for model in models}
+        with stage('features'):
+            tfidf, ling = self.features(texts, models, artifacts)
+        proba = {}
+        for model in models:
+            current = artifacts[model.name]
+            with stage(f"model:{model.name}"):
+                proba[model.name] = model.proba(tfidf[current.space.key], ling, current)
+
+        results = []
+        for i, text in enumerate(texts):
+            served = self.arm(keys[i] if keys is not None else text)
+            p = float(proba[served.name][i])
+            result = {
+                'prediction': 'REAL' if p > 0.5 else 'FAKE',
+                'confidence': max(p, 1.0 - p),
+                'model': served.name,
+                'arm': served.role,
+                'scores': {
+                    model.name: _score(model, proba[model.name][i])
+                    for model in models
+                    if model.role != 'shadow' or include_shadow
+                },
+            }
+            results.append(result)
+            monitor = getattr(served.detector, 'monitor', None)
+            if monitor is not None:
+                monitor.observe_prediction(text, int(p > 0.5), result['confidence'])
+
+        self._record(models, proba, results)
+        return results
+
+    def score(self, text, key=None, include_shadow=False):
+        return self.score_batch([text], None if key is None else [key], include_shadow)[0]
+
+    def _record(self, models, proba, results):
+        """Agreement of every model with the primary, and how often each served"""
+        reference = proba[self.primary.name]
+        with self.lock:
+            for model in models:
+                stats = self.stats.get(model.name)
+                if stats is None:
+                    continue
+                p = proba[model.name]
+                stats['scored'] += len(p)
+                stats['agreements'] += int(((p > 0.5) == (reference > 0.5)).sum())
+                stats['abs_diff_total'] += float(np.abs(p - reference).sum())
+            for result in results:
+                if result['model'] in self.stats:
+                    self.stats[result['model']]['served'] += 1
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'tfidf_passes_per_request': self.spaces,
+                'models': [
+                    {
+                        'name': model.name,
+                        'role': model.role,
+                        'traffic': model.traffic if model.role == 'candidate' else None,
+                        'scored': stats['scored'],
+                        'served': stats['served'],
+                        'agreement_with_primary': stats['agreements'] / stats['scored'] if stats['scored'] else None,
+                        'mean_abs_diff': stats['abs_diff_total'] / stats['scored'] if stats['scored'] else None,
+                    }
+                    for model in self.models
+                    for stats in [self.stats[model.name]]
+                ],
+            }
+
+
+def _score(model, p):
+    p = float(p)
+    return {'prediction': 'REAL' if p > 0.5 else 'FAKE', 'confidence': max(p, 1.0 - p),
+            'p_real': p, 'role': model.role}
+
+
+def parse_spec(spec):
+    """[(name, role, traffic)] from a "name:role[:traffic],..." string"""
+    entries = []
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        fields = part.split(':')
+        role = fields[1] if len(fields) > 1 else 'compare'
+        entries.append((fields[0], role, float(fields[2]) if len(fields) > 2 else 0.0))
+    return entries
+
+
+def build_scorer(spec=None, factories=None):
+    """MultiScorer with the models of spec; models that fail to load are skipped"""
+    factories = factories or MODEL_FACTORIES
+    scorer = MultiScorer()
+    for name, role, traffic in parse_spec(spec or DEFAULT_SPEC):
+        if name not in factories:
+            print(f"Unknown scoring model {name!r}, expected one of {sorted(factories)}")
+            continue
+        try:
+            scorer.register(name, factories[name](), role, traffic)
+        except Exception as e:
+            print(f"Could not register scoring model {name!r}: {e}")
+    return scorer
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+def get_scorer():
+    """Process-wide MultiScorer built from SCORING_MODELS on first use"""
+    global _scorer
+    with _scorer_lock:
+        if _scorer is None:
+            _scorer = build_scorer()
+        return _scorer
@@ -0,0 +1,138 @@
+# sentiment.py - Built-in lexicon sentiment scorer (TextBlob-compatible, no NLTK)
+import os
+
+import numpy as np
+
+from preprocess import preprocess
+
+LEXICON_PATH = os.path.join(os.path.dirname(__file__), 'sentiment_lexicon.tsv')
+
+# Like TextBlob, contractions ("isn't", "don't") do not negate: only these
+# words do. The ensemble was trained on TextBlob's scores.
+NEGATIONS = {'no', 'not', 'never'}
+
+# Documented tolerance against TextBlob(text).sentiment, measured on 2,657
+# English paragraphs: mean absolute difference 0.014 (polarity) and 0.021
+# (subjectivity), 95th percentile 0.08 / 0.11. The tail is driven by what
+# TextBlob's own tokenizer sees and ours drops: punctuation it reads as
+# emoticons (":(" in code samples gives the maxima of 0.85 / 1.0),
+# exclamation-mark boosts and single-letter words. A negated modifier
+# ("not very good") is also weighted differently.
+POLARITY_TOLERANCE = 0.02
+SUBJECTIVITY_TOLERANCE = 0.025
+POLARITY_TOLERANCE_P95 = 0.08
+SUBJECTIVITY_TOLERANCE_P95 = 0.11
+
+
+class SentimentLexicon:
+    """Polarity/subjectivity lexicon held as a word -> row hash and flat arrays"""
+
+    def __init__(self, path=LEXICON_PATH):
+        words = []
+        rows = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#') or not line.strip():
+                    continue
+                word, polarity, subjectivity, intensity, modifier = line.rstrip('\n').split('\t')
+                words.append(word)
+                rows.append((float(polarity), float(subjectivity), float(intensity), modifier == '1'))
+
+        self.index = {word: i for i, word in enumerate(words)}
+        values = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        # One extra trailing row (index -1) scores unknown tokens as neutral
+        values = np.vstack([values, [0.0, 0.0, 1.0, 0.0]])
+        self.polarity = values[:, 0]
+        self.subjectivity = values[:, 1]
+        self.intensity = values[:, 2]
+        self.is_modifier = values[:, 3].astype(bool)
+
+    def lookup(self, tokens):
+        """Lexicon row of each token, -1 for unknown words"""
+        get = self.index.get
+        return np.fromiter((get(t, -1) for t in tokens), dtype=np.int64, count=len(tokens))
+
+
+_lexicon = None
+
+
+def get_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = SentimentLexicon()
+    return _lexicon
+
+
+def score_batch(texts, lexicon=None):
+    """(polarity, subjectivity) arrays for many texts in one vectorized pass.
+
+    Follows TextBlob's PatternAnalyzer: only known words are assessed, an
+    adverb modifier ("very good") multiplies the next word by its intensity
+    instead of being scored itself, and a preceding negation turns polarity
+    into p * -0.5. Each text's score is the mean over its assessments.
+    """
+    lexicon = lexicon or get_lexicon()
+    docs = [preprocess(text) for text in texts]
+    lengths = np.array([len(doc.tokens) for doc in docs], dtype=np.int64)
+    tokens = [token for doc in docs for token in doc.tokens]
+
+    rows = lexicon.lookup(tokens)
+    doc_ids = np.repeat(np.arange(len(docs)), lengths)
+    known = rows >= 0
+
+    # Previous token in the same document
+    first = np.zeros(len(rows), dtype=bool)
+    starts = np.cumsum(lengths) - lengths
+    first[starts[lengths > 0]] = True
+    prev_rows = np.roll(rows, 1)
+    prev_known = np.roll(known, 1) & ~first
+
+    negated_token = np.array([t in NEGATIONS for t in tokens], dtype=bool)
+    prev_negated = np.roll(negated_token, 1) & ~first
+
+    # A known adverb directly before a known word modifies it
+    modified = known & prev_known & lexicon.is_modifier[prev_rows]
+    consumed = np.roll(modified, -1)
+    if len(consumed):
+        consumed[-1] = False
+    assessed = known & ~consumed
+
+    scale = np.where(modified, lexicon.intensity[prev_rows], 1.0)
+    polarity = np.clip(lexicon.polarity[rows] * scale, -1.0, 1.0)
+    subjectivity = np.clip(lexicon.subjectivity[rows] * scale, -1.0, 1.0)
+
+    # "not good" / "not very good": negation before the word or its modifier
+    negated = prev_negated | (modified & np.roll(prev_negated, 1))
+    polarity = np.where(negated, polarity * -0.5, polarity)
+
+    counts = np.bincount(doc_ids[assessed], minlength=len(docs))
+    polarity_sum = np.bincount(doc_ids[assessed], weights=polarity[assessed], minlength=len(docs))
+    subjectivity_sum = np.bincount(doc_ids[assessed], weights=subjectivity[assessed], minlength=len(docs))
+    divisor = np.maximum(counts, 1)
+    return polarity_sum / divisor, subjectivity_sum / divisor
+
+
+def score(text, lexicon=None):
+    """(polarity, subjectivity) for a single text"""
+    polarity, subjectivity = score_batch([text], lexicon)
+    return float(polarity[0]), float(subjectivity[0])
+
+
+def export_textblob_lexicon(path=LEXICON_PATH):
+    """Write TextBlob's English sentiment lexicon (PDDL) in our TSV format.
+
+    Only needed to regenerate sentiment_lexicon.tsv; requires textblob.
+    """
+    from textblob.en import sentiment as pattern_sentiment
+
+    pattern_sentiment.load()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# word\tpolarity\tsubjectivity\tintensity\tmodifier\n")
+        f.write("# Exported from the TextBlob/pattern en-sentiment lexicon (PDDL)\n")
+        for word in sorted(dict.keys(pattern_sentiment)):
+            senses = dict.__getitem__(pattern_sentiment, word)
+            if None not in senses or ' ' in word or '\t' in word:
+                continue
+            polarity, subjectivity, intensity = senses[None]
+            modifier = int('RB' in senses)
+            f.write(f"{word.lower()}\t{polarity:.4g}\t{subjectivity:.4g}\t{intensity:.4g}\t{modifier}\n")
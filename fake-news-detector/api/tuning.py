@@ -0,0 +1,217 @@
+# tuning.py - Parallel k-fold hyperparameter search for both detectors
+import itertools
+import pickle
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+
+from feature_store import FeatureStore
+
+# Vectorizer settings are split from model settings so the TF-IDF matrices
+# of every fold are built once per vectorizer config and shared by all models
+VECTORIZER_KEYS = ('max_features', 'min_df', 'max_df', 'ngram_range', 'sublinear_tf')
+
+SEARCH_SPACES = {
+    'basic': {
+        'max_features': [2000, 5000, 10000],
+        'sublinear_tf': [False, True],
+        'C': [0.5, 1.0, 4.0],
+        'max_iter': [1000],
+    },
+    'ai': {
+        'max_features': [2000, 5000],
+        'C': [1.0],
+        'max_iter': [2000],
+        'n_estimators': [25, 50, 100],
+        'max_depth': [6, 10, None],
+    },
+}
+
+# Number of held-out articles timed one at a time to measure inference latency
+LATENCY_SAMPLES = 50
+
+
+def expand_grid(space):
+    """All combinations of a {param: [values]} search space"""
+    keys = sorted(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def sample_space(space, n_iter, random_state=42):
+    """n_iter distinct random combinations from a search space"""
+    grid = expand_grid(space)
+    rng = np.random.RandomState(random_state)
+    picks = rng.choice(len(grid), size=min(n_iter, len(grid)), replace=False)
+    return [grid[i] for i in sorted(picks)]
+
+
+def split_params(params):
+    vectorizer_params = {'stop_words': 'english'}
+    model_params = {}
+    for key, value in params.items():
+        if key in VECTORIZER_KEYS:
+            vectorizer_params[key] = tuple(value) if isinstance(value, list) else value
+        else:
+            model_params[key] = value
+    return vectorizer_params, model_params
+
+
+def build_model(detector, model_params):
+    """Estimator matching what FakeNewsDetector / AIFakeNewsDetector train"""
+    lr = LogisticRegression(
+        C=model_params.get('C', 1.0),
+        max_iter=model_params.get('max_iter', 1000),
+        random_state=42,
+    )
+    if detector == 'basic':
+        return lr
+    rf = RandomForestClassifier(
+        n_estimators=model_params.get('n_estimators', 50),
+        max_depth=model_params.get('max_depth', 10),
+        random_state=42,
+    )
+    return VotingClassifier(estimators=[('lr', lr), ('rf', rf)], voting='soft')
+
+
+def _features(detector, tfidf, ling):
+    if detector == 'basic':
+        return tfidf
+    return np.hstack([tfidf.toarray(), ling])
+
+
+def _evaluate_fold(detector, params, fold, X_train, X_test, ling_train,
+                   ling_test, y_train, y_test):
+    _, model_params = split_params(params)
+    model = build_model(detector, model_params)
+    model.fit(_features(detector, X_train, ling_train), y_train)
+    accuracy = accuracy_score(y_test, model.predict(_features(detector, X_test, ling_test)))
+
+    result = {'fold': fold, 'accuracy': accuracy}
+    # The fold-0 model is sent back to be sized and timed in the parent
+    if fold == 0:
+        result['model'] = model
+    return result
+
+
+def _measure(detector, vectorizer, model, latency_texts, extractor):
+    """Pickled size and single-article latency percentiles of a fitted candidate"""
+    def score(text):
+        features = vectorizer.transform([text])
+        if detector != 'basic':
+            ling = np.array(list(extractor(text).values()), dtype=float)
+            features = np.concatenate([features.toarray()[0], ling]).reshape(1, -1)
+        model.predict_proba(features)
+
+    if latency_texts:
+        # Untimed warm-up, so the first timing does not include lazy setup
+        score(latency_texts[0])
+    timings = []
+    for text in latency_texts:
+        start = time.perf_counter()
+        score(text)
+        timings.append(time.perf_counter() - start)
+    return {
+        'model_size_bytes': len(pickle.dumps((vectorizer, model))),
+        'latency_ms_p50': float(np.percentile(timings, 50) * 1000) if timings else 0.0,
+        'latency_ms_p95': float(np.percentile(timings, 95) * 1000) if timings else 0.0,
+    }
+
+
+def search(texts, labels, detector='basic', space=None, n_iter=None, folds=5,
+           n_jobs=-1, feature_store=None, random_state=42):
+    """Cross-validate every candidate in the search space in parallel.
+
+    Returns one summary dict per candidate: params, mean/std accuracy,
+    pickled model size and single-article inference latency.
+    """
+    if detector not in SEARCH_SPACES:
+        raise ValueError(f"Unknown detector {detector!r}, expected one of {sorted(SEARCH_SPACES)}")
+
+    space = space or SEARCH_SPACES[detector]
+    candidates = sample_space(space, n_iter, random_state) if n_iter else expand_grid(space)
+    labels = np.asarray(labels)
+    store = feature_store or FeatureStore()
+
+    n_splits = min(folds, np.bincount(labels).min())
+    splits = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(np.zeros(len(labels)), labels))
+
+    extractor = None
+    ling = None
+    if detector == 'ai':
+        from model_ai import AIFakeNewsDetector, LINGUISTIC_FEATURES_VERSION, SENTIMENT_BACKEND
+        extractor = AIFakeNewsDetector.extract_linguistic_features
+        ling = store.linguistic(texts, extractor, {'version': LINGUISTIC_FEATURES_VERSION, 'sentiment': SENTIMENT_BACKEND})
+
+    print(f"Tuning {detector} detector: {len(candidates)} candidates x {n_splits} folds")
+
+    # Build each (vectorizer config, fold) matrix once; all model settings share it
+    fold_features = {}
+    for params in candidates:
+        vectorizer_params, _ = split_params(params)
+        config = tuple(sorted(vectorizer_params.items()))
+        for fold, (train_index, test_index) in enumerate(splits):
+            if (config, fold) not in fold_features:
+                fold_features[(config, fold)] = store.fit_tfidf_subset(texts, vectorizer_params, train_index, test_index)
+
+    tasks = []
+    for index, params in enumerate(candidates):
+        vectorizer_params, _ = split_params(params)
+        config = tuple(sorted(vectorizer_params.items()))
+        for fold, (train_index, test_index) in enumerate(splits):
+            _, X_train, X_test = fold_features[(config, fold)]
+            tasks.append((index, delayed(_evaluate_fold)(
+                detector, params, fold, X_train, X_test,
+                None if ling is None else ling[train_index],
+                None if ling is None else ling[test_index],
+                labels[train_index], labels[test_index],
+            )))
+
+    outputs = Parallel(n_jobs=n_jobs)(task for _, task in tasks)
+
+    # Latency is timed one candidate at a time after all fits have finished,
+    # so it is not skewed by folds still training on the other cores
+    latency_texts = [texts[i] for i in splits[0][1][:LATENCY_SAMPLES]]
+    results = []
+    for index, params in enumerate(candidates):
+        fold_results = [out for (i, _), out in zip(tasks, outputs) if i == index]
+        accuracies = [r['accuracy'] for r in fold_results]
+        first = next(r for r in fold_results if r['fold'] == 0)
+        vectorizer_params, _ = split_params(params)
+        vectorizer = fold_features[(tuple(sorted(vectorizer_params.items())), 0)][0]
+        results.append({
+            'params': params,
+            'accuracy_mean': float(np.mean(accuracies)),
+            'accuracy_std': float(np.std(accuracies)),
+            **_measure(detector, vectorizer, first['model'], latency_texts, extractor),
+        })
+
+    results.sort(key=lambda r: -r['accuracy_mean'])
+    return results
+
+
+def pick_fastest(results, accuracy_target=None):
+    """Fastest candidate whose mean accuracy meets the target.
+
+    Falls back to the most accurate candidate when none meets it.
+    """
+    if accuracy_target is not None:
+        eligible = [r for r in results if r['accuracy_mean'] >= accuracy_target]
+        if eligible:
+            return min(eligible, key=lambda r: (r['latency_ms_p50'], r['model_size_bytes']))
+    return max(results, key=lambda r: r['accuracy_mean'])
+
+
+def format_results(results):
+    lines = [f"{'accuracy':>14}  {'size KB':>9}  {'p50 ms':>7}  {'p95 ms':>7}  params"]
+    for r in results:
+        lines.append(
+            f"{r['accuracy_mean']:7.2%} ±{r['accuracy_std']:5.2%}  "
+            f"{r['model_size_bytes'] / 1024:9.1f}  {r['latency_ms_p50']:7.2f}  "
+            f"{r['latency_ms_p95']:7.2f}  {r['params']}"
+        )
+    return "\n".join(lines)
@@ -1,23 +1,65 @@
 # app.py
+import os
+import sys
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from model import FakeNewsDetector
 
+# Shared serving helpers live in ../api (appended so the local model.py wins)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+from admission import AdmissionController, install, limit
+import profiling
+from profiling import profiled, stage
+from retrieval import open_index
+
 app = Flask(__name__)
 CORS(app)
 
 detector = FakeNewsDetector()
 
+# Related labeled articles shown as evidence (build with ../build_index.py)
+retrieval_index = open_index()
+if retrieval_index is None:
+    print("Retrieval index not found; run build_index.py to show related articles.")
+
+# Bounded concurrency and queueing; retraining runs alone and is never queued
+analyze_admission = AdmissionController('analyze')
+train_admission = AdmissionController('train', max_concurrent=1, max_queue=0, max_per_client=1)
+install(app, [analyze_admission, train_admission])
+# GET /admin/profiles: slowest requests profiled via X-Profile or sampling
+profiling.install(app)
+
 @app.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'ok', 'message': 'Fake News Detector API running'})
 
 @app.route('/train', methods=['POST'])
+@limit(train_admission)
 def train_model():
     detector.train()
     return jsonify({'message': 'Model retrained successfully'})
 
+def related_sources(text):
+    """Most similar known-fake and known-real articles from the labeled corpus"""
+    if retrieval_index is None:
+        return []
+    return [
+        {
+            "title": match['title'],
+            "source": f"Known {match['label'].lower()} article" + (f" ({match['subject']})" if match['subject'] else ""),
+            "description": match['snippet'],
+            "date": match['date'],
+            "label": match['label'],
+            "score": match['score'],
+        }
+        for match in retrieval_index.search(text)
+    ]
+
 @app.route('/analyze', methods=['POST'])
+@limit(analyze_admission)
+@profiled('analyze', detector)
 def analyze():
     data = request.json
     text = data.get('text', '').strip()
@@ -25,7 +67,8 @@ def analyze():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
 
-    prediction, confidence = detector.predict(text)
+    with stage('predict'):
+        prediction, confidence = detector.predict(text)
 
     if prediction is None:
         return jsonify({'error': 'Model not loaded'}), 500
@@ -33,6 +76,9 @@ def analyze():
     is_fake = prediction == 0
     confidence_percentage = round(confidence * 100, 1)
 
+    with stage('related_sources'):
+        sources = related_sources(text)
+
     if is_fake:
         result = {
             "prediction": "FAKE",
@@ -40,18 +86,7 @@ def analyze():
             "title": "Likely Misinformation",
             "message": "This content appears to be false or misleading",
             "type": "fake",
-            "sources": [
-                {
-                    "title": "Fact Check: The Real Story Behind This Claim",
-                    "source": "Snopes",
-                    "description": "This claim has been debunked by multiple fact-checking organizations. The actual events occurred differently..."
-                },
-                {
-                    "title": "What Actually Happened: Full Report",
-                    "source": "FactCheck.org",
-                    "description": "According to official sources and verified reports, the true version of events is..."
-                }
-            ],
+            "sources": sources,
             "warning": "This content may spread misinformation. Please verify with trusted sources before sharing."
         }
     else:
@@ -61,23 +96,7 @@ def analyze():
             "title": "Verified as Real",
             "message": "This news appears to be authentic",
             "type": "real",
-            "sources": [
-                {
-                    "title": "Reuters - Breaking News",
-                    "source": "Reuters",
-                    "date": "2025-10-28"
-                },
-                {
-                    "title": "Associated Press",
-                    "source": "Associated Press",
-                    "date": "2025-10-28"
-                },
-                {
-                    "title": "BBC News",
-                    "source": "BBC News",
-                    "date": "2025-10-27"
-                }
-            ],
+            "sources": sources,
             "warning": None
         }
 
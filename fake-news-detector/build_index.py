@@ -0,0 +1,68 @@
+# build_index.py - Build or update the related-article retrieval index
+import argparse
+import sys
+import os
+
+# Add the api directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from dataset import SAMPLE_FAKE, SAMPLE_TRUE, find_data_files, read_text_columns
+from retrieval import DEFAULT_INDEX_DIR, RetrievalIndex, open_index
+
+
+def read_column(paths, column, count):
+    """One CSV column as a list, or None if the files do not have it"""
+    try:
+        values, _ = read_text_columns(paths, column)
+    except Exception:
+        return None
+    return list(values) if len(values) == count else None
+
+
+def read_articles(paths, labels):
+    """(texts, labels, titles, subjects, dates) from labeled CSV files"""
+    texts, counts = read_text_columns(paths)
+    labels = [label for label, count in zip(labels, counts) for _ in range(count)]
+    n = len(texts)
+    return (list(texts), labels, read_column(paths, 'title', n),
+            read_column(paths, 'subject', n), read_column(paths, 'date', n))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the related-article retrieval index")
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR)
+    parser.add_argument('--rebuild', action='store_true',
+                        help="refit the vocabulary and rewrite the whole index")
+    parser.add_argument('--add', metavar='CSV', help="index new labeled articles from this CSV")
+    parser.add_argument('--label', choices=['fake', 'real'], help="label of the articles in --add")
+    args = parser.parse_args()
+
+    if args.add:
+        if not args.label:
+            parser.error("--add needs --label")
+        articles = read_articles([args.add], [0 if args.label == 'fake' else 1])
+    else:
+        fake_path, true_path = find_data_files()
+        try:
+            if not fake_path:
+                raise FileNotFoundError("CSV files not found")
+            articles = read_articles([fake_path, true_path], [0, 1])
+        except Exception as e:
+            print(f"Using sample data ({e})")
+            articles = (SAMPLE_FAKE + SAMPLE_TRUE, [0] * len(SAMPLE_FAKE) + [1] * len(SAMPLE_TRUE), None, None, None)
+
+    index = None if args.rebuild else open_index(args.index_dir)
+    if index is None:
+        print(f"🔧 Building index from {len(articles[0])} articles...")
+        index = RetrievalIndex.build(*articles[:2], path=args.index_dir, titles=articles[2],
+                                     subjects=articles[3], dates=articles[4])
+    else:
+        # Existing segments are kept; only articles not yet indexed are added
+        added = index.add(*articles)
+        print(f"➕ Added {added} new articles ({len(articles[0]) - added} already indexed)")
+
+    print(f"✅ Index has {len(index)} articles in {len(index.segments)} segments ({args.index_dir})")
+
+
+if __name__ == "__main__":
+    main()
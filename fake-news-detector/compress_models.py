@@ -0,0 +1,44 @@
+# compress_models.py - Export float32 / int8 model artifacts and check verdict parity
+import argparse
+import sys
+import os
+
+# Add the api directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from compact import PRECISIONS, artifact_path, format_report
+from dataset import load_training_data
+from model import FakeNewsDetector
+from model_ai import AIFakeNewsDetector, VARIANTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export reduced-precision model artifacts")
+    parser.add_argument('--precision', choices=PRECISIONS[1:], action='append',
+                        help="precision to export (repeatable, default: all)")
+    parser.add_argument('--sample-size', type=int, default=500,
+                        help="articles per class used for the parity check (0 = full dataset)")
+    args = parser.parse_args()
+
+    texts, labels = load_training_data(sample_size=args.sample_size or None)
+    print(f"📊 Checking parity on {len(texts)} articles\n")
+
+    detectors = [('basic', FakeNewsDetector(precision='float64'))]
+    detectors += [(f"ai-{variant}", AIFakeNewsDetector(variant=variant, precision='float64')) for variant in VARIANTS]
+
+    for name, detector in detectors:
+        if not detector.model or not detector.vectorizer:
+            print(f"⚠️  {name}: no trained model, skipping\n")
+            continue
+        for precision in args.precision or PRECISIONS[1:]:
+            report = detector.export_compact(precision, texts, labels)
+            path = getattr(detector, 'distilled_path', None) if name == 'ai-distilled' else detector.model_path
+            size = os.path.getsize(artifact_path(path, precision))
+            print(format_report(name, report))
+            print(f"  💾 {os.path.basename(artifact_path(path, precision))} ({size / 1024:.1f} KB on disk)\n")
+
+    print("Set MODEL_PRECISION=float32 (or int8) to serve the compact artifacts.")
+
+
+if __name__ == "__main__":
+    main()
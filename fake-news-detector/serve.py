@@ -0,0 +1,279 @@
+# serve.py - Self-hosted runner for the serverless endpoints in api/
+import argparse
+import importlib
+import io
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Add the api directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from admission import AdmissionController, Rejected, body_length, check_text, client_address, request_deadline
+
+# Vercel functions mounted under /api/<name>; each module defines `handler`
+ENDPOINTS = ('health', 'analyze', 'analyze_ai')
+# Endpoints whose POSTs go through admission control
+ADMITTED = ('analyze', 'analyze_ai')
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', 8000))
+WORKERS = int(os.environ.get('SERVER_WORKERS', 1))
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', 5))
+# Longest wait for in-flight requests on shutdown
+SHUTDOWN_GRACE = float(os.environ.get('SHUTDOWN_GRACE', 30))
+
+
+def load_routes(names=ENDPOINTS):
+    """{path: handler class}, importing each endpoint (and warming its model) once"""
+    routes = {}
+    for name in names:
+        module = importlib.import_module(name)
+        routes[f"/api/{name}"] = module.handler
+    return routes
+
+
+class Router(BaseHTTPRequestHandler):
+    """Dispatches requests on a persistent HTTP/1.1 connection to endpoint handlers.
+
+    The endpoint handlers are written for the serverless runtime, which
+    buffers their output. Here too the status, headers and body they write
+    are collected first, then sent with a Content-Length so the connection
+    can be reused. The request body is read up front for the same reason.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    routes = {}
+    admission = {}
+    quiet = False
+
+    def handle_one_request(self):
+        self._buffering = False
+        super().handle_one_request()
+
+    def __getattr__(self, name):
+        # http.server calls do_<METHOD>; every method goes through _dispatch
+        if name.startswith('do_'):
+            return self._dispatch
+        raise AttributeError(name)
+
+    def send_response(self, code, message=None):
+        if not self._buffering:
+            return super().send_response(code, message)
+        self._status = (code, message)
+        self._headers = []
+
+    def send_header(self, keyword, value):
+        if not self._buffering:
+            return super().send_header(keyword, value)
+        self._headers.append((keyword, value))
+
+    def end_headers(self):
+        if not self._buffering:
+            return super().end_headers()
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def _reply(self, status, response, headers=()):
+        headers = [('Content-type', 'application/json'), *headers]
+        self._send(status, None, headers, json.dumps(response).encode('utf-8'))
+
+    def _send(self, status, message, headers, body):
+        if self.server.draining:
+            self.close_connection = True
+        super().send_response(status, message)
+        for keyword, value in headers:
+            if keyword.lower() not in ('content-length', 'connection'):
+                super().send_header(keyword, value)
+        super().send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            super().send_header('Connection', 'close')
+        super().end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """Whole request body, or None after refusing it"""
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            self.close_connection = True
+            self._reply(411, {'error': 'Content-Length required'})
+            return None
+        try:
+            length = body_length(self.headers)
+        except Rejected as e:
+            # Not read (or of unknown extent), so the connection cannot be reused
+            self.close_connection = True
+            self._reply(e.status, {'error': e.message})
+            return None
+        return self.rfile.read(length)
+
+    def _dispatch(self):
+        path = urlparse(self.path).path.rstrip('/')
+        name = path.rsplit('/', 1)[-1]
+        endpoint = self.routes.get(path)
+        body = self._read_body()
+        if body is None:
+            return
+        if endpoint is None:
+            self._reply(404, {'error': f'No endpoint at {path or "/"}'})
+            return
+        method = getattr(endpoint, f"do_{self.command}", None)
+        if method is None:
+            allowed = sorted(m[3:] for m in dir(endpoint) if m.startswith('do_'))
+            self._reply(405, {'error': 'Method not allowed'}, [('Allow', ', '.join(allowed))])
+            return
+
+        ticket = None
+        controller = self.admission.get(name) if self.command == 'POST' else None
+        if controller is not None:
+            try:
+                # Overlong articles are refused before they take a slot
+                check_text(_request_text(body))
+                ticket = controller.acquire(client_address(self.headers, self.client_address[0]), request_deadline(controller, self.headers))
+            except Rejected as e:
+                headers = [('Retry-After', str(e.retry_after))] if e.retry_after else []
+                self._reply(e.status, {'error': e.message, 'reason': e.reason}, headers)
+                return
+
+        rfile, wfile = self.rfile, self.wfile
+        self.rfile, self.wfile = io.BytesIO(body), io.BytesIO()
+        self._buffering = True
+        self._status = None
+        start = time.monotonic()
+        error = None
+        try:
+            method(self)
+        except Exception as e:
+            error = e
+        finally:
+            self._buffering = False
+            payload = self.wfile.getvalue()
+            self.rfile, self.wfile = rfile, wfile
+            if ticket is not None:
+                controller.release(ticket, time.monotonic() - start)
+
+        if error is not None or self._status is None:
+            self._reply(500, {'error': str(error) if error else 'Endpoint sent no response'})
+        else:
+            self._send(*self._status, self._headers, payload)
+
+
+def _request_text(body):
+    """The "text" field of a JSON request body, if there is one"""
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        return None
+    return data.get('text') if isinstance(data, dict) else None
+
+
+class Server(ThreadingHTTPServer):
+    """Thread per connection; shutdown waits for in-flight requests"""
+
+    daemon_threads = False
+    block_on_close = True
+    # Accept backlog for bursts of new connections
+    request_queue_size = 128
+    draining = False
+
+
+def make_router(routes, quiet=False):
+    """Router class bound to routes, with one admission controller per analyze endpoint"""
+    admission = {name: AdmissionController(name) for name in ADMITTED if f"/api/{name}" in routes}
+    return type('Router', (Router,), {'routes': routes, 'admission': admission, 'quiet': quiet})
+
+
+def serve(server):
+    """Serve until SIGTERM/SIGINT, then stop accepting and finish in-flight requests"""
+    stopping = threading.Event()
+
+    def stop(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stopping.wait()
+
+    # Idle keep-alive connections end within KEEPALIVE_TIMEOUT; busy ones
+    # get Connection: close on their next response
+    server.draining = True
+    server.shutdown()
+    closer = threading.Thread(target=server.server_close, daemon=True)
+    closer.start()
+    closer.join(SHUTDOWN_GRACE)
+
+
+def prefork(server, workers):
+    """Fork workers that accept on the already-bound socket; returns in each child"""
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            return None
+        children.append(pid)
+
+    def forward(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+    return children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the api/ endpoints on one port")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help="pre-forked worker processes (each with its own warm models)")
+    parser.add_argument('--quiet', action='store_true', help="do not log every request")
+    args = parser.parse_args()
+
+    # Imported before forking, so workers start warm and share the loaded
+    # model pages copy-on-write
+    print("🔧 Loading endpoints...")
+    router = make_router(load_routes(), args.quiet)
+    server = Server((args.host, args.port), router)
+    print(f"✅ Serving {', '.join(router.routes)} on http://{args.host}:{server.server_port} "
+          f"({args.workers} worker{'s' if args.workers > 1 else ''})")
+
+    if args.workers > 1 and hasattr(os, 'fork'):
+        # The parent only supervises; the children accept on the socket
+        # bound above
+        if prefork(server, args.workers) is not None:
+            server.server_close()
+            print("👋 Stopped")
+        else:
+            serve(server)
+        return
+
+    serve(server)
+    print("👋 Stopped")
+
+
+if __name__ == "__main__":
+    main()
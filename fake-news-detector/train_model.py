@@ -5,10 +5,16 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
 
 from model import FakeNewsDetector
+from dataset import peak_rss_mb
+
+# Pass --full to train on every article instead of 500 per class
+sample_size = None if '--full' in sys.argv else 500
 
 print("🔄 Starting model training...")
 detector = FakeNewsDetector()
-detector.train()
+detector.train(sample_size=sample_size)
 print("✅ Model training complete!")
+if peak_rss_mb():
+    print(f"📈 Peak memory: {peak_rss_mb():.0f} MB")
 print("📊 Model saved to api/fake_news_model.pkl")
 print("📊 Vectorizer saved to api/tfidf_vectorizer.pkl")
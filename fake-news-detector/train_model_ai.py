@@ -6,6 +6,7 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
 
 from model_ai import AIFakeNewsDetector
+from dataset import peak_rss_mb
 
 def main():
     print("=" * 60)
@@ -25,11 +26,20 @@ def main():
     print("  ✓ Ensemble learning (multiple models voting)")
     print()
     
-    detector.train()
+    # Pass --full to train on every article instead of 500 per class
+    detector.train(sample_size=None if '--full' in sys.argv else 500)
     
     print("\n" + "=" * 60)
     print("🎉 TRAINING COMPLETE!")
     print("=" * 60)
+    if peak_rss_mb():
+        print(f"📈 Peak memory: {peak_rss_mb():.0f} MB")
+    print()
+    
+    # Distill the ensemble into the low-latency serving variant
+    # (pass --no-distill to skip)
+    if '--no-distill' not in sys.argv:
+        detector.distill()
     print()
     
     # Test with sample articles
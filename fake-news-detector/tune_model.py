@@ -0,0 +1,50 @@
+# tune_model.py - Cross-validated hyperparameter search for both detectors
+import argparse
+import json
+import sys
+import os
+
+# Add the api directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from dataset import load_training_data
+from tuning import search, pick_fastest, format_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the fake news detectors")
+    parser.add_argument('--detector', choices=['basic', 'ai'], default='basic')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--n-iter', type=int, default=None,
+                        help="random search with this many candidates (default: full grid)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="parallel workers (-1 = all cores)")
+    parser.add_argument('--sample-size', type=int, default=500,
+                        help="articles per class (0 = full dataset)")
+    parser.add_argument('--accuracy-target', type=float, default=None,
+                        help="pick the fastest model with at least this mean accuracy")
+    parser.add_argument('--output', help="write all results to this JSON file")
+    args = parser.parse_args()
+
+    texts, labels = load_training_data(sample_size=args.sample_size or None)
+    print(f"📊 Tuning on {len(texts)} articles")
+
+    results = search(texts, labels, detector=args.detector, n_iter=args.n_iter,
+                     folds=args.folds, n_jobs=args.n_jobs)
+
+    print()
+    print(format_results(results))
+    print()
+
+    best = pick_fastest(results, args.accuracy_target)
+    print(f"✅ Selected: {best['params']}")
+    print(f"   accuracy {best['accuracy_mean']:.2%}, "
+          f"{best['model_size_bytes'] / 1024:.1f} KB, {best['latency_ms_p50']:.2f} ms/article")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'selected': best, 'results': results}, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()